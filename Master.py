@@ -10,12 +10,55 @@ Fixes:
 """
 
 import sys
+import re
 import json
+import functools
+import itertools
+import operator
+import collections
+from collections import ChainMap
 import threading
 import time
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
+# Prefer orjson for the request/response hot path; fall back to the stdlib json module.
+# _dumps always returns UTF-8 bytes and _loads accepts str or bytes.
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    # Compact, non-ASCII-escaped output, byte-for-byte like orjson's
+    def _dumps(obj): return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    _loads = json.loads
+
+# Operator types resolved from td at import: (type name, fallback type name or None)
+_TD_TYPES = [
+    # Basic types that should always be available
+    ("textDAT", None), ("tableDAT", None), ("scriptDAT", None),
+    ("circleTOP", None), ("noiseTOP", None), ("constantTOP", None), ("rampTOP", None), ("textTOP", None), ("outTOP", None),
+    ("constantCHOP", None), ("noiseCHOP", None), ("lfoCHOP", None), ("mathCHOP", None), ("selectCHOP", None), ("outCHOP", None),
+    ("sphereSOP", None), ("boxSOP", None), ("gridSOP", None), ("lineSOP", None), ("nullSOP", None), ("outSOP", None),
+    ("baseCOMP", None), ("containerCOMP", None), ("geometryCOMP", None), ("cameraCOMP", None), ("lightCOMP", None),
+    ("buttonCOMP", None), ("sliderCOMP", None),
+    ("phongMAT", None), ("pbrMAT", None), ("constantMAT", None),
+    # Additional types that might not be available in all versions
+    ("opfindDAT", "textDAT"), ("executeDAT", "textDAT"),
+    ("moviefileinTOP", "constantTOP"), ("audioDeviceInCHOP", "constantCHOP"),
+    ("blurTOP", "constantTOP"), ("levelTOP", "constantTOP"), ("compositeTOP", "constantTOP"),
+    ("displaceTOP", "constantTOP"), ("feedbackTOP", "constantTOP"), ("lutTOP", "constantTOP"),
+    ("filterCHOP", "constantCHOP"), ("lagCHOP", "constantCHOP"), ("chopexecuteCHOP", "constantCHOP"),
+    ("mergeCHOP", "constantCHOP"), ("waveCHOP", "constantCHOP"),
+    ("tubeSOP", "sphereSOP"), ("mergeSOP", "nullSOP"), ("transformSOP", "nullSOP"),
+    ("copySOP", "nullSOP"), ("groupSOP", "nullSOP"),
+    ("panelCOMP", "baseCOMP"), ("webCOMP", "baseCOMP"), ("switchCOMP", "baseCOMP"),
+    ("renderCOMP", "baseCOMP"), ("audioCOMP", "baseCOMP"),
+    ("glslMAT", "phongMAT"), ("textureMAT", "phongMAT"), ("videoMAT", "phongMAT"),
+]
+
 # Import TouchDesigner-specific modules
 try:
     import td
@@ -24,116 +67,11 @@ try:
         TDF = True
         print("Running inside TouchDesigner - MCP server will start.")
         
-        # Import specific operator types needed for mapping - handle missing types gracefully
-        def safe_import_td_type(module, type_name, default=None):
-            try:
-                return getattr(module, type_name)
-            except AttributeError:
-                print(f"Warning: {type_name} not available in this TouchDesigner version")
-                return default
-        
-        # Import basic types that should always be available
-        textDAT = safe_import_td_type(td, 'textDAT')
-        tableDAT = safe_import_td_type(td, 'tableDAT')
-        scriptDAT = safe_import_td_type(td, 'scriptDAT')
-        circleTOP = safe_import_td_type(td, 'circleTOP')
-        noiseTOP = safe_import_td_type(td, 'noiseTOP')
-        constantTOP = safe_import_td_type(td, 'constantTOP')
-        rampTOP = safe_import_td_type(td, 'rampTOP')
-        textTOP = safe_import_td_type(td, 'textTOP')
-        outTOP = safe_import_td_type(td, 'outTOP')
-        constantCHOP = safe_import_td_type(td, 'constantCHOP')
-        noiseCHOP = safe_import_td_type(td, 'noiseCHOP')
-        lfoCHOP = safe_import_td_type(td, 'lfoCHOP')
-        mathCHOP = safe_import_td_type(td, 'mathCHOP')
-        selectCHOP = safe_import_td_type(td, 'selectCHOP')
-        outCHOP = safe_import_td_type(td, 'outCHOP')
-        sphereSOP = safe_import_td_type(td, 'sphereSOP')
-        boxSOP = safe_import_td_type(td, 'boxSOP')
-        gridSOP = safe_import_td_type(td, 'gridSOP')
-        lineSOP = safe_import_td_type(td, 'lineSOP')
-        nullSOP = safe_import_td_type(td, 'nullSOP')
-        outSOP = safe_import_td_type(td, 'outSOP')
-        baseCOMP = safe_import_td_type(td, 'baseCOMP')
-        containerCOMP = safe_import_td_type(td, 'containerCOMP')
-        geometryCOMP = safe_import_td_type(td, 'geometryCOMP')
-        cameraCOMP = safe_import_td_type(td, 'cameraCOMP')
-        lightCOMP = safe_import_td_type(td, 'lightCOMP')
-        buttonCOMP = safe_import_td_type(td, 'buttonCOMP')
-        sliderCOMP = safe_import_td_type(td, 'sliderCOMP')
-        phongMAT = safe_import_td_type(td, 'phongMAT')
-        pbrMAT = safe_import_td_type(td, 'pbrMAT')
-        constantMAT = safe_import_td_type(td, 'constantMAT')
-        
-        # Import additional types that might not be available in all versions
-        opfindDAT = safe_import_td_type(td, 'opfindDAT')
-        executeDAT = safe_import_td_type(td, 'executeDAT')
-        moviefileinTOP = safe_import_td_type(td, 'moviefileinTOP')
-        audioDeviceInCHOP = safe_import_td_type(td, 'audioDeviceInCHOP')
-        
-        # Import additional TOP types
-        blurTOP = safe_import_td_type(td, 'blurTOP')
-        levelTOP = safe_import_td_type(td, 'levelTOP')
-        compositeTOP = safe_import_td_type(td, 'compositeTOP')
-        displaceTOP = safe_import_td_type(td, 'displaceTOP')
-        feedbackTOP = safe_import_td_type(td, 'feedbackTOP')
-        lutTOP = safe_import_td_type(td, 'lutTOP')
-        
-        # Import additional CHOP types
-        filterCHOP = safe_import_td_type(td, 'filterCHOP')
-        lagCHOP = safe_import_td_type(td, 'lagCHOP')
-        chopexecuteCHOP = safe_import_td_type(td, 'chopexecuteCHOP')
-        mergeCHOP = safe_import_td_type(td, 'mergeCHOP')
-        waveCHOP = safe_import_td_type(td, 'waveCHOP')
-        
-        # Import additional SOP types
-        tubeSOP = safe_import_td_type(td, 'tubeSOP')
-        mergeSOP = safe_import_td_type(td, 'mergeSOP')
-        transformSOP = safe_import_td_type(td, 'transformSOP')
-        copySOP = safe_import_td_type(td, 'copySOP')
-        groupSOP = safe_import_td_type(td, 'groupSOP')
-        
-        # Import additional COMP types
-        panelCOMP = safe_import_td_type(td, 'panelCOMP')
-        webCOMP = safe_import_td_type(td, 'webCOMP')
-        switchCOMP = safe_import_td_type(td, 'switchCOMP')
-        renderCOMP = safe_import_td_type(td, 'renderCOMP')
-        audioCOMP = safe_import_td_type(td, 'audioCOMP')
-        
-        # Import additional MAT types
-        glslMAT = safe_import_td_type(td, 'glslMAT')
-        textureMAT = safe_import_td_type(td, 'textureMAT')
-        videoMAT = safe_import_td_type(td, 'videoMAT')
-        
-        # Set defaults for missing types
-        if opfindDAT is None: opfindDAT = textDAT
-        if executeDAT is None: executeDAT = textDAT
-        if moviefileinTOP is None: moviefileinTOP = constantTOP
-        if audioDeviceInCHOP is None: audioDeviceInCHOP = constantCHOP
-        if blurTOP is None: blurTOP = constantTOP
-        if levelTOP is None: levelTOP = constantTOP
-        if compositeTOP is None: compositeTOP = constantTOP
-        if displaceTOP is None: displaceTOP = constantTOP
-        if feedbackTOP is None: feedbackTOP = constantTOP
-        if lutTOP is None: lutTOP = constantTOP
-        if filterCHOP is None: filterCHOP = constantCHOP
-        if lagCHOP is None: lagCHOP = constantCHOP
-        if chopexecuteCHOP is None: chopexecuteCHOP = constantCHOP
-        if mergeCHOP is None: mergeCHOP = constantCHOP
-        if waveCHOP is None: waveCHOP = constantCHOP
-        if tubeSOP is None: tubeSOP = sphereSOP
-        if mergeSOP is None: mergeSOP = nullSOP
-        if transformSOP is None: transformSOP = nullSOP
-        if copySOP is None: copySOP = nullSOP
-        if groupSOP is None: groupSOP = nullSOP
-        if panelCOMP is None: panelCOMP = baseCOMP
-        if webCOMP is None: webCOMP = baseCOMP
-        if switchCOMP is None: switchCOMP = baseCOMP
-        if renderCOMP is None: renderCOMP = baseCOMP
-        if audioCOMP is None: audioCOMP = baseCOMP
-        if glslMAT is None: glslMAT = phongMAT
-        if textureMAT is None: textureMAT = phongMAT
-        if videoMAT is None: videoMAT = phongMAT
+        # Report operator types missing from this build - they resolve to a same-family
+        # fallback through _TYPE_CHAIN below
+        for _type_name, _ in _TD_TYPES:
+            if getattr(td, _type_name, None) is None:
+                print(f"Warning: {_type_name} not available in this TouchDesigner version")
         
     else:
         TDF = False
@@ -193,25 +131,154 @@ if not TDF:
         if path == "/invalid_path": return None
         return MockOp(path)
     def run(command, delayFrames=0): print(f"Mock run: {command}")
-    # Define all mock component types for create operations
-    textDAT = td.textDAT; tableDAT = td.tableDAT; scriptDAT = td.scriptDAT; opfindDAT = td.opfindDAT; executeDAT = td.executeDAT
-    circleTOP = td.circleTOP; noiseTOP = td.noiseTOP; moviefileinTOP = td.moviefileinTOP; constantTOP = td.constantTOP; rampTOP = td.rampTOP; textTOP = td.textTOP; outTOP = td.outTOP
-    blurTOP = td.blurTOP; levelTOP = td.levelTOP; compositeTOP = td.compositeTOP; displaceTOP = td.displaceTOP; feedbackTOP = td.feedbackTOP; lutTOP = td.lutTOP
-    constantCHOP = td.constantCHOP; noiseCHOP = td.noiseCHOP; lfoCHOP = td.lfoCHOP; mathCHOP = td.mathCHOP; selectCHOP = td.selectCHOP; outCHOP = td.outCHOP
-    filterCHOP = td.filterCHOP; lagCHOP = td.lagCHOP; chopexecuteCHOP = td.chopexecuteCHOP; mergeCHOP = td.mergeCHOP; waveCHOP = td.waveCHOP
-    sphereSOP = td.sphereSOP; boxSOP = td.boxSOP; gridSOP = td.gridSOP; lineSOP = td.lineSOP; nullSOP = td.nullSOP; outSOP = td.outSOP
-    tubeSOP = td.tubeSOP; mergeSOP = td.mergeSOP; transformSOP = td.transformSOP; copySOP = td.copySOP; groupSOP = td.groupSOP
-    baseCOMP = td.baseCOMP; containerCOMP = td.containerCOMP; geometryCOMP = td.geometryCOMP; cameraCOMP = td.cameraCOMP; lightCOMP = td.lightCOMP; buttonCOMP = td.buttonCOMP; sliderCOMP = td.sliderCOMP
-    panelCOMP = td.panelCOMP; webCOMP = td.webCOMP; switchCOMP = td.switchCOMP; renderCOMP = td.renderCOMP; audioCOMP = td.audioCOMP
-    phongMAT = td.phongMAT; pbrMAT = td.pbrMAT; constantMAT = td.constantMAT; glslMAT = td.glslMAT; textureMAT = td.textureMAT; videoMAT = td.videoMAT
+
+# --- Component Type Lookup ---
+# Real td types first, same-family fallbacks second. Fallbacks are only resolved for types
+# missing from this build, so a complete TD install allocates none.
+_TD_AVAILABLE = {name: getattr(td, name) for name, _ in _TD_TYPES if getattr(td, name, None) is not None}
+_TD_FALLBACKS = {name: _TD_AVAILABLE.get(fallback) for name, fallback in _TD_TYPES if fallback and name not in _TD_AVAILABLE}
+_TYPE_CHAIN = ChainMap(_TD_AVAILABLE, _TD_FALLBACKS)
+
+# Normalized type string -> operator type name, resolved through _TYPE_CHAIN. Built once at import.
+_COMP_TYPE_MAP = {
+    # DATs
+    "text": "textDAT", "table": "tableDAT", "script": "scriptDAT", 
+    "opfind": "opfindDAT", "execute": "executeDAT", "dat": "textDAT",
+    
+    # TOPs
+    "circle": "circleTOP", "noise": "noiseTOP", "moviefilein": "moviefileinTOP",
+    "constant": "constantTOP", "ramp": "rampTOP", "texttop": "textTOP", 
+    "out": "outTOP", "blur": "blurTOP", "level": "levelTOP", "composite": "compositeTOP",
+    "displace": "displaceTOP", "feedback": "feedbackTOP", "lut": "lutTOP",
+    
+    # CHOPs
+    "constantchop": "constantCHOP", "noisechop": "noiseCHOP", "lfo": "lfoCHOP",
+    "math": "mathCHOP", "selectchop": "selectCHOP", "outchop": "outCHOP",
+    "filter": "filterCHOP", "lag": "lagCHOP", "chopexecute": "chopexecuteCHOP",
+    "merge": "mergeCHOP", "wave": "waveCHOP",
+    
+    # SOPs
+    "sphere": "sphereSOP", "box": "boxSOP", "grid": "gridSOP", "line": "lineSOP",
+    "nullsop": "nullSOP", "outsop": "outSOP", "tube": "tubeSOP", "merge": "mergeSOP",
+    "transform": "transformSOP", "copy": "copySOP", "group": "groupSOP",
+    
+    # COMPs
+    "base": "baseCOMP", "container": "containerCOMP", "geometrycomp": "geometryCOMP",
+    "cameracomp": "cameraCOMP", "lightcomp": "lightCOMP", "buttoncomp": "buttonCOMP",
+    "slidercomp": "sliderCOMP", "panel": "panelCOMP", "web": "webCOMP",
+    "switch": "switchCOMP", "render": "renderCOMP", "audio": "audioCOMP",
+    
+    # MATs
+    "phong": "phongMAT", "pbr": "pbrMAT", "constantmat": "constantMAT",
+    "glsl": "glslMAT", "texture": "textureMAT", "video": "videoMAT",
+    
+    # Common aliases
+    "render": "outTOP", "cam": "cameraCOMP", "camera": "cameraCOMP",
+    "mov": "moviefileinTOP", "movie": "moviefileinTOP", "geo": "geometryCOMP",
+    "material": "phongMAT", "light": "lightCOMP", "null": "nullSOP"
+}
+
+# Family suffixes and whitespace stripped from a type string before lookup
+_SUFFIX_RE = re.compile(r"comp|sop|top|dat|mat|\s")
+
+@functools.lru_cache(maxsize=256)
+def _normalize_type(comp_type_str):
+    """Lowercases a type string and strips family suffixes, e.g. 'circleTOP' -> 'circle'."""
+    return _SUFFIX_RE.sub("", comp_type_str.lower())
+
+# --- Pending Command Params ---
+# Tool handlers stash their params here and pass only the integer token through run(),
+# so the payload is never JSON-encoded, repr()-quoted and re-parsed on the main thread.
+_PENDING = {}
+_next_token = itertools.count()
+
+def _stash_params(params):
+    """Stores params for a queued command and returns its token."""
+    token = next(_next_token)
+    _PENDING[token] = params
+    return token
+
+# Operations queued by the HTTP threads within one frame are drained by a single run() callback
+_PENDING_OPS = collections.deque()
+_drain_lock = threading.Lock()
+_drain_scheduled = False
+_FRAME_BUDGET = 16        # Max operations executed per TD frame; the rest roll over to the next frame
+_MAX_PENDING_OPS = 256    # Queue depth at which new commands are refused until TD catches up
+
+def _schedule_drain(dat_path):
+    """Schedules _drain_pending for the next frame unless one is already scheduled."""
+    global _drain_scheduled
+    with _drain_lock:
+        if _drain_scheduled: return
+        _drain_scheduled = True
+    try:
+        run(f"mod('{dat_path}')._drain_pending({dat_path!r})", delayFrames=1)
+    except Exception:
+        with _drain_lock: _drain_scheduled = False
+        raise
+
+def _queue_op(op_name, params, dat_path):
+    """Queues a _run_* operation and schedules a drain if one isn't already pending."""
+    if not TDF:
+        # The mock run() only prints, so nothing would ever drain the queue; run the operation here instead
+        _DISPATCH[op_name](_stash_params(params)); return
+    if len(_PENDING_OPS) >= _MAX_PENDING_OPS:
+        raise RuntimeError(f"Command queue full ({_MAX_PENDING_OPS} pending), try again shortly")
+    token = _stash_params(params); entry = (op_name, token)
+    _PENDING_OPS.append(entry)
+    try: _schedule_drain(dat_path)
+    except Exception:
+        # The caller reports an error, so the operation must not run on a later drain
+        try: _PENDING_OPS.remove(entry)
+        except ValueError: pass
+        _PENDING.pop(token, None)
+        raise
+
+def _drain_pending(dat_path):
+    """Runs up to _FRAME_BUDGET queued operations in arrival order (main TD thread)."""
+    global _drain_scheduled
+    # Clear the flag first so anything queued while draining schedules a fresh callback
+    with _drain_lock: _drain_scheduled = False
+    for _ in range(_FRAME_BUDGET):
+        if not _PENDING_OPS: return
+        op_name, token = _PENDING_OPS.popleft()
+        _DISPATCH[op_name](token)
+    # Budget spent - leave the rest for the next frame so bursts don't stall rendering
+    if _PENDING_OPS: _schedule_drain(dat_path)
+
+# Per-command progress lines are off by default - each print() updates the Textport UI.
+# Errors and list/get/execute results are always printed. Toggle via POST /api/verbose.
+_VERBOSE = False
+
+# --- Parameter Value Coercion ---
+_TRUTHY = frozenset(("true", "1", "on"))
+
+def _to_bool(value): return str(value).lower() in _TRUTHY
+
+# Current parameter value type -> converter for incoming values; other types are set as strings
+_COERCERS = {bool: _to_bool, int: int, float: float}
+
+def _coerce_value(current_val, value):
+    """Converts value to the type of a parameter's current value, falling back to str."""
+    try: return _COERCERS.get(type(current_val), str)(value)
+    except ValueError: return str(value)
+
+# --- Connection Types ---
+# connect_type -> fn(target_par, source_op) used by _run_create
+_CONNECT_DISPATCH = {
+    "bind": lambda target_par, source_op: target_par.bind(source_op),
+    "chop": lambda target_par, source_op: setattr(target_par, "expr", f"op('{source_op.path}')"),
+    "top": lambda target_par, source_op: setattr(target_par, "expr", f"op('{source_op.path}').output"),
+    "pulse": lambda target_par, source_op: source_op.par.pulse.pulse(target_par),
+}
 
 # --- Helper Functions for run() ---
 # These functions run in the main TD thread
 
-def _run_create(params_json):
+def _run_create(token):
     """Creates a component in the main thread."""
     try:
-        params = json.loads(params_json)
+        params = _PENDING.pop(token)
         comp_type_str = params.get("type")
         name = params.get("name")
         parent_path = params.get("parent", "/")
@@ -219,49 +286,13 @@ def _run_create(params_json):
         # New connection parameters
         connect_source = params.get("connect_source")
         connect_parameter = params.get("connect_parameter")
+        connect_type = params.get("connect_type", "bind")  # bind, chop, top, pulse
 
         if not comp_type_str: raise ValueError("Missing type")
 
-        comp_type_map = {
-            # DATs
-            "text": textDAT, "table": tableDAT, "script": scriptDAT, 
-            "opfind": opfindDAT, "execute": executeDAT, "dat": textDAT,
-            
-            # TOPs
-            "circle": circleTOP, "noise": noiseTOP, "moviefilein": moviefileinTOP,
-            "constant": constantTOP, "ramp": rampTOP, "texttop": textTOP, 
-            "out": outTOP, "blur": blurTOP, "level": levelTOP, "composite": compositeTOP,
-            "displace": displaceTOP, "feedback": feedbackTOP, "lut": lutTOP,
-            
-            # CHOPs
-            "constantchop": constantCHOP, "noisechop": noiseCHOP, "lfo": lfoCHOP,
-            "math": mathCHOP, "selectchop": selectCHOP, "outchop": outCHOP,
-            "filter": filterCHOP, "lag": lagCHOP, "chopexecute": chopexecuteCHOP,
-            "merge": mergeCHOP, "wave": waveCHOP,
-            
-            # SOPs
-            "sphere": sphereSOP, "box": boxSOP, "grid": gridSOP, "line": lineSOP,
-            "nullsop": nullSOP, "outsop": outSOP, "tube": tubeSOP, "merge": mergeSOP,
-            "transform": transformSOP, "copy": copySOP, "group": groupSOP,
-            
-            # COMPs
-            "base": baseCOMP, "container": containerCOMP, "geometrycomp": geometryCOMP,
-            "cameracomp": cameraCOMP, "lightcomp": lightCOMP, "buttoncomp": buttonCOMP,
-            "slidercomp": sliderCOMP, "panel": panelCOMP, "web": webCOMP,
-            "switch": switchCOMP, "render": renderCOMP, "audio": audioCOMP,
-            
-            # MATs
-            "phong": phongMAT, "pbr": pbrMAT, "constantmat": constantMAT,
-            "glsl": glslMAT, "texture": textureMAT, "video": videoMAT,
-            
-            # Common aliases
-            "render": outTOP, "cam": cameraCOMP, "camera": cameraCOMP,
-            "mov": moviefileinTOP, "movie": moviefileinTOP, "geo": geometryCOMP,
-            "material": phongMAT, "light": lightCOMP, "null": nullSOP
-        }
-        comp_type_key = comp_type_str.lower().replace(" ", "").replace("comp", "").replace("sop", "").replace("top", "").replace("dat", "").replace("mat", "")
-        comp_type = comp_type_map.get(comp_type_key)
-        if comp_type_key == 'geometry': comp_type = geometryCOMP # Special case
+        comp_type_key = _normalize_type(comp_type_str)
+        if comp_type_key == 'geometry': comp_type_key = 'geo' # Special case
+        comp_type = _TYPE_CHAIN.get(_COMP_TYPE_MAP.get(comp_type_key))
 
         if not comp_type:
             try:
@@ -270,16 +301,18 @@ def _run_create(params_json):
             except Exception: comp_type = None
             if not comp_type: raise ValueError(f"Unsupported type: {comp_type_str}")
 
+        parent_op = op(parent_path)
+        if not parent_op or not parent_op.valid: raise ValueError(f"Invalid parent: {parent_path}")
+
         if not name:
-            base_name = comp_type_str.lower().replace("comp", "").replace("sop", "").replace("top", "").replace("dat", "").replace("mat", "")
-            i = 1; name = f"{base_name}{i}";
-            while op(f"{parent_path}/{name}"):
+            # Snapshot sibling names once instead of probing op() for every candidate
+            base_name = _normalize_type(comp_type_str)
+            existing = {child.name for child in parent_op.children if child and child.valid}
+            i = 1; name = f"{base_name}{i}"
+            while name in existing:
                 i += 1
                 name = f"{base_name}{i}"
 
-        parent_op = op(parent_path)
-        if not parent_op or not parent_op.valid: raise ValueError(f"Invalid parent: {parent_path}")
-
         # Handle the create method call properly
         try:
             new_op = parent_op.create(comp_type, name)
@@ -302,14 +335,7 @@ def _run_create(params_json):
                 try:
                     param_obj = getattr(new_op.par, key, None)
                     if param_obj:
-                        current_val = param_obj.val; target_type = type(current_val)
-                        try:
-                            if target_type == bool: value_conv = str(value).lower() in ["true", "1", "on"]
-                            elif target_type == int: value_conv = int(value)
-                            elif target_type == float: value_conv = float(value)
-                            else: value_conv = str(value)
-                        except ValueError: value_conv = str(value)
-                        param_obj.val = value_conv
+                        param_obj.val = _coerce_value(param_obj.val, value)
                     # else: print(f"MCP Run Warning: Param 			'{key}' not found on {new_op.path}") # Optional warning
                 except Exception as e: print(f"MCP Run Warning: Failed to set {key} on {new_op.path}: {e}")
 
@@ -319,18 +345,12 @@ def _run_create(params_json):
                 source_op = op(connect_source)
                 if source_op and source_op.valid:
                     target_par = new_op.par[connect_parameter]
-                    if target_par:
-                        # Handle different connection types
-                        if connect_type == 'bind':
-                            target_par.bind(source_op)
-                        elif connect_type == 'chop':
-                            target_par.expr = f"op('{connect_source}')"
-                        elif connect_type == 'top':
-                            target_par.expr = f"op('{connect_source}').output"
-                        elif connect_type == 'pulse':
-                            source_op.par.pulse.pulse(target_par)
-                        
-                        print(f"Connected {new_op.path}.{connect_parameter} to {connect_source} ({connect_type})")
+                    connect = _CONNECT_DISPATCH.get(connect_type)
+                    if connect is None:
+                        print(f"Connection failed: Unknown connect_type {connect_type}")
+                    elif target_par:
+                        connect(target_par, source_op)
+                        if _VERBOSE: print(f"Connected {new_op.path}.{connect_parameter} to {connect_source} ({connect_type})")
                     else:
                         print(f"Connection failed: Target parameter {connect_parameter} not found")
                 else:
@@ -338,14 +358,14 @@ def _run_create(params_json):
             except Exception as e:
                 print(f"Connection error: {str(e)}")
 
-        print(f"MCP Run: Created component at {new_op.path}")
+        if _VERBOSE: print(f"MCP Run: Created component at {new_op.path}")
     except Exception as e:
         print(f"MCP Run Error (_run_create): {e}")
 
-def _run_delete(params_json):
+def _run_delete(token):
     """Deletes a component in the main thread."""
     try:
-        params = json.loads(params_json)
+        params = _PENDING.pop(token)
         path = params.get("path")
         if not path: raise ValueError("Missing path")
         component = op(path)
@@ -353,92 +373,99 @@ def _run_delete(params_json):
         parent = component.parent(); name = component.name
         component.destroy()
         parent_path = parent.path if parent and parent.valid else "(invalid)"
-        print(f"MCP Run: Deleted {name} from {parent_path}")
+        if _VERBOSE: print(f"MCP Run: Deleted {name} from {parent_path}")
     except Exception as e:
         print(f"MCP Run Error (_run_delete): {e}")
 
-def _run_set(params_json):
+def _run_set(token):
     """Sets a parameter in the main thread."""
     try:
-        params = json.loads(params_json)
+        params = _PENDING.pop(token)
         path = params.get("path"); parameter = params.get("parameter"); value_str = params.get("value")
         if not path or not parameter or value_str is None: raise ValueError("Missing params")
         component = op(path)
         if not component or not component.valid: raise ValueError(f"Invalid component: {path}")
         param_obj = getattr(component.par, parameter, None)
         if param_obj:
-            current_val = param_obj.val; target_type = type(current_val)
-            try:
-                if target_type == bool: value = str(value_str).lower() in ["true", "1", "on"]
-                elif target_type == int: value = int(value_str)
-                elif target_type == float: value = float(value_str)
-                else: value = str(value_str)
-            except ValueError: value = str(value_str)
+            value = _coerce_value(param_obj.val, value_str)
             param_obj.val = value
-            print(f"MCP Run: Set {parameter}={value} on {path}")
+            if _VERBOSE: print(f"MCP Run: Set {parameter}={value} on {path}")
         else: raise ValueError(f"Parameter not found: {parameter}")
     except Exception as e:
         print(f"MCP Run Error (_run_set): {e}")
 
-def _run_execute(params_json):
+@functools.lru_cache(maxsize=512)
+def _compile_code(code):
+    """Compiles execute_python source once; repeated snippets reuse the cached code object."""
+    return compile(code, "<mcp>", "exec")
+
+_EXEC_OVERLAY = None
+
+def _exec_overlay():
+    """Returns the names _run_execute layers over the live module globals, built on first use."""
+    global _EXEC_OVERLAY
+    if _EXEC_OVERLAY is None:
+        # Explicitly include the operator types (fallbacks under the requested name)
+        overlay = dict(_TYPE_CHAIN)
+        if TDF:
+            overlay["td"] = td; overlay["op"] = op; overlay["project"] = project
+        _EXEC_OVERLAY = overlay
+    return _EXEC_OVERLAY
+
+def _run_execute(token):
     """Executes Python code in the main thread."""
     try:
-        params = json.loads(params_json)
+        params = _PENDING.pop(token)
         code = params.get("code"); context_path = params.get("context")
         if not code: raise ValueError("Missing code")
-        exec_globals = globals().copy(); exec_locals = {}
+        # globals() is copied per call so executed code sees current server state, not a snapshot
+        exec_globals = globals().copy(); exec_globals.update(_exec_overlay()); exec_locals = {}
         if TDF:
-            exec_globals["td"] = td; exec_globals["op"] = op; exec_globals["project"] = project
             context_op = op(context_path) if context_path else op("/")
             if context_op and context_op.valid: exec_globals["me"] = context_op
             else: exec_globals["me"] = op("/")
 
-            # --- Add this section to explicitly include imported TD types ---
-            td_types_to_include = [
-                textDAT, tableDAT, scriptDAT, opfindDAT, executeDAT,
-                circleTOP, noiseTOP, moviefileinTOP, constantTOP, rampTOP, textTOP, outTOP,
-                constantCHOP, noiseCHOP, lfoCHOP, mathCHOP, selectCHOP, outCHOP, audioDeviceInCHOP,
-                sphereSOP, boxSOP, gridSOP, lineSOP, nullSOP, outSOP,
-                baseCOMP, containerCOMP, geometryCOMP, cameraCOMP, lightCOMP, buttonCOMP, sliderCOMP,
-                phongMAT, pbrMAT, constantMAT
-                # Add any other specific types you import and want accessible directly by name
-            ]
-            for td_type in td_types_to_include:
-                if hasattr(td_type, '__name__'): # Ensure it's a valid type/class
-                     exec_globals[td_type.__name__] = td_type
-            # --- End of added section ---
-
-        exec(code, exec_globals, exec_locals)
+        exec(_compile_code(code), exec_globals, exec_locals)
         result_val = exec_locals.get("result", "Python code executed via run().")
         if isinstance(result_val, (td.OP, td.Parameter, td.ParGroup)): result_str = str(result_val)
         else:
-            try: json.dumps(result_val); result_str = result_val
+            try: _dumps(result_val); result_str = result_val
             except TypeError: result_str = str(result_val)
         print(f"MCP Run: Executed Python. Result: {result_str}")
     except Exception as e:
         print(f"MCP Run Error (_run_execute): {e}")
 
-def _run_list(params_json):
+_LIST_PREFILTER_MIN = 512  # Child count above which type-filtered listing prefilters in C first
+_get_type = operator.attrgetter("type")
+
+def _prefilter_by_type(children, type_filter):
+    """Narrows a large child list to one type using map/compress, which loop in C."""
+    try: return list(itertools.compress(children, map(functools.partial(operator.eq, type_filter), map(_get_type, children))))
+    except Exception: return children  # e.g. an invalid child - let the regular filter handle it
+
+def _run_list(token):
     """Lists components in the main thread."""
     try:
-        params = json.loads(params_json)
+        params = _PENDING.pop(token)
         path = params.get("path", "/"); type_filter = params.get("type")
         target_op = op(path)
         if not target_op or not target_op.valid: print(f"MCP Run List Warning: Path invalid {path}"); return
-        components = []
-        if hasattr(target_op, 'children'):
-            for child in target_op.children:
-                if child and child.valid:
-                    child_type = getattr(child, 'type', 'N/A'); child_name = getattr(child, 'name', 'N/A'); child_path = getattr(child, 'path', 'N/A')
-                    if not type_filter or child_type == type_filter: components.append({"path": child_path, "type": child_type, "name": child_name})
-        print(f"MCP Run List Result ({path}): {json.dumps(components)}")
+        _ga = getattr  # Local alias keeps the per-child lookups out of the global namespace
+        children = _ga(target_op, 'children', ())
+        if type_filter and len(children) > _LIST_PREFILTER_MIN: children = _prefilter_by_type(children, type_filter)
+        components = [
+            {"path": _ga(child, 'path', 'N/A'), "type": child_type, "name": _ga(child, 'name', 'N/A')}
+            for child in children if child and child.valid
+            for child_type in (_ga(child, 'type', 'N/A'),) if not type_filter or child_type == type_filter
+        ]
+        print(f"MCP Run List Result ({path}): {_dumps(components).decode()}")
     except Exception as e:
         print(f"MCP Run Error (_run_list): {e}")
 
-def _run_get(params_json):
+def _run_get(token):
     """Gets component/parameter info in the main thread."""
     try:
-        params = json.loads(params_json)
+        params = _PENDING.pop(token)
         path = params.get("path"); parameter = params.get("parameter")
         if not path: raise ValueError("Missing path")
         op_obj = op(path)
@@ -453,10 +480,31 @@ def _run_get(params_json):
         else:
             param_list = [p.name for p in op_obj.pars()] if hasattr(op_obj, "pars") else []
             result = {"path": path, "exists": True, "type": op_obj.type if hasattr(op_obj, "type") else "N/A", "name": op_obj.name if hasattr(op_obj, "name") else "N/A", "parameters": param_list}
-        print(f"MCP Run Get Result ({path}): {json.dumps(result)}")
+        print(f"MCP Run Get Result ({path}): {_dumps(result).decode()}")
     except Exception as e:
         print(f"MCP Run Error (_run_get): {e}")
 
+# Operation name -> main-thread helper, used by _drain_pending
+_DISPATCH = {
+    "create": _run_create, "delete": _run_delete, "set": _run_set,
+    "execute": _run_execute, "list": _run_list, "get": _run_get,
+}
+
+# --- Context Sources ---
+# Each source returns a list of context items
+
+def _context_operators(query):
+    """Operators whose name matches the query (direct call - potentially unsafe if TD API used)."""
+    # NOTE: This context function might still cause threading issues if it uses TD API calls.
+    # For safety, it should ideally also use run() or only access non-TD data.
+    try:
+        matches = op("/").findChildren(name=f"*{query}*") if TDF else []
+        context_items = []
+        for match in matches:
+            if match and match.valid:
+                context_items.append({"uri": match.path, "content": f"Op: {match.name} ({match.type})", "metadata": {"type": "operator", "name": match.name}})
+        return context_items
+    except Exception as e: print(f"Context Error: {e}"); return [{"uri": "info:error", "content": "Error retrieving context."}]
 
 # --- MCP Server Implementation (Port 8052) ---
 
@@ -467,28 +515,120 @@ server_running = False
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 8053  # Changed to 8053 to avoid conflict
 
-class ThreadingHTTPServer(HTTPServer):
-    """Allow storing DAT path."""
+# Fixed response headers for every JSON reply
+_JSON_HEADERS = b"Content-Type: application/json\r\nAccess-Control-Allow-Origin: *\r\n"
+
+SERVER_MAX_WORKERS = 10  # Requests only queue work for TD, so a small fixed pool is enough
+# An idle kept-alive connection holds its worker for up to the handler timeout, so past this many open
+# connections responses say Connection: close and some workers always stay free for new clients
+_KEEPALIVE_MAX = SERVER_MAX_WORKERS - 2
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """Handles requests on a bounded worker pool and stores the DAT path."""
+    daemon_threads = True
+
     def __init__(self, server_address, RequestHandlerClass, dat_path, bind_and_activate=True):
         super().__init__(server_address, RequestHandlerClass, bind_and_activate)
         self.dat_path = dat_path # Store the path of the DAT running the server
+        self.executor = ThreadPoolExecutor(max_workers=SERVER_MAX_WORKERS, thread_name_prefix="mcp")
+        self.open_connections = 0  # Connections currently holding a worker
+        self._connections_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        with self._connections_lock: self.open_connections += 1
+        try: super().process_request_thread(request, client_address)
+        finally:
+            with self._connections_lock: self.open_connections -= 1
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+# Request header limits, matching http.client's defaults
+_MAX_HEADER_LINE = 65536
+_MAX_HEADERS = 100
+
+class _RequestHeaders(dict):
+    """Header map with case-insensitive get(); keys are stored lowercased."""
+    def get(self, key, default=None): return dict.get(self, key.lower(), default)
 
 class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
     """Handler for TouchDesigner MCP requests"""
+    protocol_version = "HTTP/1.1"  # Keep connections open across sequential tool calls
+    timeout = 5  # Close idle keep-alive connections so they don't pin pool workers
+    rbufsize = 16 * 1024  # Read the socket in 16 KiB chunks; the buffer lives for the whole connection
 
     def log_message(self, format, *args): return # Suppress logs
 
+    def parse_request(self):
+        """Lean replacement for BaseHTTPRequestHandler.parse_request.
+
+        The MCP endpoints only need the request line, Content-Length, Connection and Expect, so
+        header lines are split straight into a dict instead of going through email.parser.
+        """
+        self.command = None
+        self.request_version = self.default_request_version
+        self.close_connection = True
+        requestline = str(self.raw_requestline, "iso-8859-1").rstrip("\r\n")
+        self.requestline = requestline
+        words = requestline.split()
+        if len(words) != 3 or not words[2].startswith("HTTP/"):
+            self.send_error(400, f"Bad request syntax ({requestline!r})")
+            return False
+        self.command, self.path, version = words
+        # Version check as in the stdlib parser: HTTP/<digits>.<digits>, below 2.0
+        version_number = version[5:].split(".")
+        if len(version_number) != 2 or not all(n.isdigit() and len(n) <= 10 for n in version_number):
+            self.send_error(400, f"Bad request version ({version!r})")
+            return False
+        version_number = int(version_number[0]), int(version_number[1])
+        if version_number >= (2, 0):
+            self.send_error(505, f"Invalid HTTP version ({version[5:]})")
+            return False
+        self.request_version = version
+
+        headers = _RequestHeaders()
+        while True:
+            line = self.rfile.readline(_MAX_HEADER_LINE + 1)
+            if len(line) > _MAX_HEADER_LINE or len(headers) > _MAX_HEADERS:
+                self.send_error(431, "Request header fields too large")
+                return False
+            if line in (b"\r\n", b"\n", b""): break
+            key, _, value = line.decode("iso-8859-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        self.headers = headers
+
+        connection = headers.get("connection", "").lower()
+        if connection == "close": self.close_connection = True
+        elif version_number >= (1, 1) or connection == "keep-alive": self.close_connection = False
+        # Only POST bodies are read; any other body would be parsed as the next request on a kept-alive connection
+        if self.command != "POST" and ("content-length" in headers or "transfer-encoding" in headers):
+            self.close_connection = True
+        if self.server.open_connections > _KEEPALIVE_MAX: self.close_connection = True
+        # Clients like curl hold back larger bodies until they see 100 Continue
+        if version_number >= (1, 1) and headers.get("expect", "").lower() == "100-continue":
+            return self.handle_expect_100()
+        return True
+
     def _send_json(self, data, status=200):
         try:
-            self.send_response(status)
-            self.send_header("Content-type", "application/json")
-            self.send_header("Access-Control-Allow-Origin", "*")
-            self.end_headers()
-            self.wfile.write(json.dumps(data).encode("utf-8"))
+            body = _dumps(data)
+            # Status line, headers and body are assembled in one buffer and sent in a single write
+            reason = self.responses.get(status, ("",))[0]
+            buf = bytearray(f"{self.protocol_version} {status} {reason}\r\n".encode("latin-1"))
+            buf += _JSON_HEADERS
+            buf += b"Connection: close\r\n" if self.close_connection else b"Connection: keep-alive\r\n"
+            buf += b"Content-Length: %d\r\n\r\n" % len(body)
+            buf += body
+            self.wfile.write(buf)
         except Exception as e: print(f"Error sending JSON response: {e}")
 
     def _handle_error(self, message, status_code=400):
         print(f"MCP Server Error: {message} (Status: {status_code})")
+        self.close_connection = True  # The request body may be partly unread, so the stream can't be trusted
         self._send_json({"error": {"message": message, "code": -32000}}, status=status_code)
 
     def do_OPTIONS(self):
@@ -496,6 +636,7 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
     def do_GET(self):
@@ -508,30 +649,27 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
 
     def do_POST(self):
         try:
+            if self.headers.get("Transfer-Encoding"): return self._handle_error("Transfer-Encoding is not supported", 501)
             content_length = int(self.headers.get("Content-Length", 0))
+            if content_length < 0: return self._handle_error("Invalid Content-Length", 400)
             if content_length == 0: return self._handle_error("Empty request body", 400)
-            post_data = self.rfile.read(content_length).decode("utf-8")
-            data = json.loads(post_data)
+            data = _loads(self.rfile.read(content_length))
             parsed_path = urlparse(self.path); path = parsed_path.path
-            if path == "/mcp": self._handle_mcp_request(data)
-            elif path == "/context": self._handle_context_request(data)
-            else: self._handle_error(f"Unknown POST endpoint: {path}", 404)
+            route = self._POST_ROUTES.get(path)
+            if route is None: return self._handle_error(f"Unknown POST endpoint: {path}", 404)
+            route(self, data)
         except json.JSONDecodeError: self._handle_error("Invalid JSON", 400)
         except Exception as e: self._handle_error(f"Error handling POST: {str(e)}", 500)
 
     def _handle_mcp_request(self, data):
         method = data.get("method"); params = data.get("params", {})
         if not method: return self._handle_error("Missing 'method'", 400)
-        print(f"Received MCP method: {method} with params: {params}")
+        if not isinstance(method, str): return self._handle_error("Invalid 'method'", 400)
+        if _VERBOSE: print(f"Received MCP method: {method} with params: {params}")
         try:
-            result = None
-            if method == "create": result = self._tool_create_component(params)
-            elif method == "list": result = self._tool_list_components(params)
-            elif method == "delete": result = self._tool_delete_component(params)
-            elif method == "set": result = self._tool_set_parameter(params)
-            elif method == "get": result = self._tool_get_info(params)
-            elif method == "execute_python": result = self._tool_execute_python(params)
-            else: return self._handle_error(f"Unknown MCP method: {method}", 404)
+            tool = self._MCP_TOOLS.get(method)
+            if tool is None: return self._handle_error(f"Unknown MCP method: {method}", 404)
+            result = tool(self, params)
             self._send_json({"result": result})
         except Exception as e:
             error_message = f"Error executing MCP method '{method}': {str(e)}"
@@ -539,22 +677,29 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
             self._send_json({"error": {"message": error_message, "code": -32001}}, status=500)
 
     def _handle_context_request(self, data):
-         query = data.get("query", ""); print(f"Received context query: {query}")
+         query = data.get("query", "")
+         if _VERBOSE: print(f"Received context query: {query}")
          try:
              context_items = self._get_context(query)
+             if not context_items: context_items = [{"uri": "info:none", "content": "No relevant context found."}]
              self._send_json({"contextItems": context_items})
          except Exception as e:
              error_message = f"Error getting context: {str(e)}"; print(error_message)
              self._handle_error(error_message, 500)
 
+    def _handle_verbose_request(self, data):
+        """Toggles per-command Textport logging: {"enabled": true|false}."""
+        global _VERBOSE
+        _VERBOSE = bool(data.get("enabled", not _VERBOSE))
+        self._send_json({"verbose": _VERBOSE})
+
     # --- Tool Implementation Functions --- (ALL use run())
 
     def _tool_create_component(self, params):
         """Queues component creation in the main thread."""
         try:
             if not params.get("type"): raise ValueError("Missing type param")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_create({repr(params_json)})", delayFrames=1)
+            _queue_op("create", params, self.server.dat_path)
             # Return structured response for Claude Desktop
             return {"content": [{"type": "text", "text": "Command queued: create component"}]}
         except Exception as e: raise RuntimeError(f"Error queuing create command: {e}")
@@ -563,8 +708,7 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
         """Queues component deletion in the main thread."""
         try:
             if not params.get("path"): raise ValueError("Missing path param")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_delete({repr(params_json)})", delayFrames=1)
+            _queue_op("delete", params, self.server.dat_path)
             # Return structured response for Claude Desktop
             return {"content": [{"type": "text", "text": "Command queued: delete component"}]}
         except Exception as e: raise RuntimeError(f"Error queuing delete command: {e}")
@@ -574,8 +718,7 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
         try:
             if not params.get("path") or not params.get("parameter") or params.get("value") is None:
                  raise ValueError("Missing params for set")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_set({repr(params_json)})", delayFrames=1)
+            _queue_op("set", params, self.server.dat_path)
             # Return structured response for Claude Desktop
             return {"content": [{"type": "text", "text": "Command queued: set parameter"}]}
         except Exception as e: raise RuntimeError(f"Error queuing set command: {e}")
@@ -584,8 +727,7 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
         """Queues Python execution in the main thread."""
         try:
             if not params.get("code"): raise ValueError("Missing code param")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_execute({repr(params_json)})", delayFrames=1)
+            _queue_op("execute", params, self.server.dat_path)
             # Return structured response for Claude Desktop
             return {"content": [{"type": "text", "text": "Command queued: execute python"}]}
         except Exception as e: raise RuntimeError(f"Error queuing execute command: {e}")
@@ -593,8 +735,7 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
     def _tool_list_components(self, params):
         """Queues component listing in the main thread."""
         try:
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_list({repr(params_json)})", delayFrames=1)
+            _queue_op("list", params, self.server.dat_path)
             # Return structured response for Claude Desktop
             return {"content": [{"type": "text", "text": "Command queued: list components"}]}
         except Exception as e: raise RuntimeError(f"Error queuing list command: {e}")
@@ -603,25 +744,22 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
         """Queues component/parameter info retrieval in the main thread."""
         try:
             if not params.get("path"): raise ValueError("Missing path param")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_get({repr(params_json)})", delayFrames=1)
+            _queue_op("get", params, self.server.dat_path)
             # Return structured response for Claude Desktop
             return {"content": [{"type": "text", "text": "Command queued: get info"}]}
         except Exception as e: raise RuntimeError(f"Error queuing get command: {e}")
 
     def _get_context(self, query):
-        """Placeholder for context retrieval logic (direct call - potentially unsafe if TD API used)."""
-        # NOTE: This context function might still cause threading issues if it uses TD API calls.
-        # For safety, it should ideally also use run() or only access non-TD data.
-        try:
-            matches = op("/").findChildren(name=f"*{query}*") if TDF else []
-            context_items = []
-            for match in matches:
-                if match and match.valid:
-                    context_items.append({"uri": match.path, "content": f"Op: {match.name} ({match.type})", "metadata": {"type": "operator", "name": match.name}})
-            if not context_items: return [{"uri": "info:none", "content": "No relevant context found."}]
-            return context_items
-        except Exception as e: print(f"Context Error: {e}"); return [{"uri": "info:error", "content": "Error retrieving context."}]
+        """Returns the context items for a query; operators are the only source so far."""
+        return _context_operators(query)
+
+    # --- Dispatch Tables --- (plain functions, called with self)
+    _POST_ROUTES = {"/mcp": _handle_mcp_request, "/context": _handle_context_request, "/api/verbose": _handle_verbose_request}
+    _MCP_TOOLS = {
+        "create": _tool_create_component, "list": _tool_list_components,
+        "delete": _tool_delete_component, "set": _tool_set_parameter,
+        "get": _tool_get_info, "execute_python": _tool_execute_python,
+    }
 
 
 # --- Server Control Functions ---
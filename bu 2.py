@@ -10,12 +10,58 @@ Fixes:
 """
 
 import sys
+import re
 import json
+import functools
+import collections
+import enum
+import fnmatch
+import heapq
+import itertools
+import logging
+import logging.handlers
+import operator
+import queue
 import threading
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
+# Prefer orjson for the request/response hot path; fall back to the stdlib json module.
+# _dumps always returns UTF-8 bytes and _loads accepts str or bytes.
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    # Compact, non-ASCII-escaped output, byte-for-byte like orjson's
+    def _dumps(obj): return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    _loads = json.loads
+
+# Operator types imported from td: (type name, fallback type name or None).
+# A fallback is always listed before the types that use it.
+_TD_TYPES = [
+    ("textDAT", None), ("tableDAT", None), ("scriptDAT", None),
+    ("circleTOP", None), ("noiseTOP", None), ("constantTOP", None), ("rampTOP", None), ("textTOP", None), ("outTOP", None),
+    ("constantCHOP", None), ("noiseCHOP", None), ("lfoCHOP", None), ("mathCHOP", None), ("selectCHOP", None), ("outCHOP", None),
+    ("sphereSOP", None), ("boxSOP", None), ("gridSOP", None), ("lineSOP", None), ("nullSOP", None), ("outSOP", None),
+    ("baseCOMP", None), ("containerCOMP", None), ("geometryCOMP", None), ("cameraCOMP", None),
+    ("lightCOMP", None), ("buttonCOMP", None), ("sliderCOMP", None),
+    ("phongMAT", None), ("pbrMAT", None), ("constantMAT", None),
+    # Types that might not be available in all versions
+    ("opfindDAT", "textDAT"), ("executeDAT", "textDAT"),
+    ("moviefileinTOP", "constantTOP"), ("blurTOP", "constantTOP"), ("levelTOP", "constantTOP"),
+    ("compositeTOP", "constantTOP"), ("displaceTOP", "constantTOP"), ("feedbackTOP", "constantTOP"), ("lutTOP", "constantTOP"),
+    ("audioDeviceInCHOP", "constantCHOP"), ("filterCHOP", "constantCHOP"), ("lagCHOP", "constantCHOP"),
+    ("chopexecuteCHOP", "constantCHOP"), ("mergeCHOP", "constantCHOP"), ("waveCHOP", "constantCHOP"),
+    ("tubeSOP", "sphereSOP"), ("mergeSOP", "nullSOP"), ("transformSOP", "nullSOP"), ("copySOP", "nullSOP"), ("groupSOP", "nullSOP"),
+    ("panelCOMP", "baseCOMP"), ("webCOMP", "baseCOMP"), ("switchCOMP", "baseCOMP"), ("renderCOMP", "baseCOMP"),
+    ("audioCOMP", "baseCOMP"), ("mergeCOMP", "baseCOMP"), ("nullCOMP", "baseCOMP"),
+    ("glslMAT", "phongMAT"), ("textureMAT", "phongMAT"), ("videoMAT", "phongMAT"),
+]
+
 # Import TouchDesigner-specific modules
 try:
     import td
@@ -32,120 +78,10 @@ try:
                 print(f"Warning: {type_name} not available in this TouchDesigner version")
                 return default
         
-        # Import basic types that should always be available
-        textDAT = safe_import_td_type(td, 'textDAT')
-        tableDAT = safe_import_td_type(td, 'tableDAT')
-        scriptDAT = safe_import_td_type(td, 'scriptDAT')
-        circleTOP = safe_import_td_type(td, 'circleTOP')
-        noiseTOP = safe_import_td_type(td, 'noiseTOP')
-        constantTOP = safe_import_td_type(td, 'constantTOP')
-        rampTOP = safe_import_td_type(td, 'rampTOP')
-        textTOP = safe_import_td_type(td, 'textTOP')
-        outTOP = safe_import_td_type(td, 'outTOP')
-        constantCHOP = safe_import_td_type(td, 'constantCHOP')
-        noiseCHOP = safe_import_td_type(td, 'noiseCHOP')
-        lfoCHOP = safe_import_td_type(td, 'lfoCHOP')
-        mathCHOP = safe_import_td_type(td, 'mathCHOP')
-        selectCHOP = safe_import_td_type(td, 'selectCHOP')
-        outCHOP = safe_import_td_type(td, 'outCHOP')
-        sphereSOP = safe_import_td_type(td, 'sphereSOP')
-        boxSOP = safe_import_td_type(td, 'boxSOP')
-        gridSOP = safe_import_td_type(td, 'gridSOP')
-        lineSOP = safe_import_td_type(td, 'lineSOP')
-        nullSOP = safe_import_td_type(td, 'nullSOP')
-        outSOP = safe_import_td_type(td, 'outSOP')
-        baseCOMP = safe_import_td_type(td, 'baseCOMP')
-        containerCOMP = safe_import_td_type(td, 'containerCOMP')
-        geometryCOMP = safe_import_td_type(td, 'geometryCOMP')
-        cameraCOMP = safe_import_td_type(td, 'cameraCOMP')
-        lightCOMP = safe_import_td_type(td, 'lightCOMP')
-        buttonCOMP = safe_import_td_type(td, 'buttonCOMP')
-        sliderCOMP = safe_import_td_type(td, 'sliderCOMP')
-        phongMAT = safe_import_td_type(td, 'phongMAT')
-        pbrMAT = safe_import_td_type(td, 'pbrMAT')
-        constantMAT = safe_import_td_type(td, 'constantMAT')
-        
-        # Import additional COMP types that might be needed
-        mergeCOMP = safe_import_td_type(td, 'mergeCOMP')
-        switchCOMP = safe_import_td_type(td, 'switchCOMP')
-        nullCOMP = safe_import_td_type(td, 'nullCOMP')
-        mergeCOMP = safe_import_td_type(td, 'mergeCOMP')
-        switchCOMP = safe_import_td_type(td, 'switchCOMP')
-        nullCOMP = safe_import_td_type(td, 'nullCOMP')
-        
-        # Import additional types that might not be available in all versions
-        opfindDAT = safe_import_td_type(td, 'opfindDAT')
-        executeDAT = safe_import_td_type(td, 'executeDAT')
-        moviefileinTOP = safe_import_td_type(td, 'moviefileinTOP')
-        audioDeviceInCHOP = safe_import_td_type(td, 'audioDeviceInCHOP')
-        
-        # Import additional TOP types
-        blurTOP = safe_import_td_type(td, 'blurTOP')
-        levelTOP = safe_import_td_type(td, 'levelTOP')
-        compositeTOP = safe_import_td_type(td, 'compositeTOP')
-        displaceTOP = safe_import_td_type(td, 'displaceTOP')
-        feedbackTOP = safe_import_td_type(td, 'feedbackTOP')
-        lutTOP = safe_import_td_type(td, 'lutTOP')
-        
-        # Import additional CHOP types
-        filterCHOP = safe_import_td_type(td, 'filterCHOP')
-        lagCHOP = safe_import_td_type(td, 'lagCHOP')
-        chopexecuteCHOP = safe_import_td_type(td, 'chopexecuteCHOP')
-        mergeCHOP = safe_import_td_type(td, 'mergeCHOP')
-        waveCHOP = safe_import_td_type(td, 'waveCHOP')
-        
-        # Import additional SOP types
-        tubeSOP = safe_import_td_type(td, 'tubeSOP')
-        mergeSOP = safe_import_td_type(td, 'mergeSOP')
-        transformSOP = safe_import_td_type(td, 'transformSOP')
-        copySOP = safe_import_td_type(td, 'copySOP')
-        groupSOP = safe_import_td_type(td, 'groupSOP')
-        
-        # Import additional COMP types
-        panelCOMP = safe_import_td_type(td, 'panelCOMP')
-        webCOMP = safe_import_td_type(td, 'webCOMP')
-        switchCOMP = safe_import_td_type(td, 'switchCOMP')
-        renderCOMP = safe_import_td_type(td, 'renderCOMP')
-        audioCOMP = safe_import_td_type(td, 'audioCOMP')
-        mergeCOMP = safe_import_td_type(td, 'mergeCOMP')
-        nullCOMP = safe_import_td_type(td, 'nullCOMP')
-        
-        # Import additional MAT types
-        glslMAT = safe_import_td_type(td, 'glslMAT')
-        textureMAT = safe_import_td_type(td, 'textureMAT')
-        videoMAT = safe_import_td_type(td, 'videoMAT')
-        
-        # Set defaults for missing types
-        if opfindDAT is None: opfindDAT = textDAT
-        if executeDAT is None: executeDAT = textDAT
-        if moviefileinTOP is None: moviefileinTOP = constantTOP
-        if audioDeviceInCHOP is None: audioDeviceInCHOP = constantCHOP
-        if blurTOP is None: blurTOP = constantTOP
-        if levelTOP is None: levelTOP = constantTOP
-        if compositeTOP is None: compositeTOP = constantTOP
-        if displaceTOP is None: displaceTOP = constantTOP
-        if feedbackTOP is None: feedbackTOP = constantTOP
-        if lutTOP is None: lutTOP = constantTOP
-        if filterCHOP is None: filterCHOP = constantCHOP
-        if lagCHOP is None: lagCHOP = constantCHOP
-        if chopexecuteCHOP is None: chopexecuteCHOP = constantCHOP
-        if mergeCHOP is None: mergeCHOP = constantCHOP
-        if waveCHOP is None: waveCHOP = constantCHOP
-        if tubeSOP is None: tubeSOP = sphereSOP
-        if mergeSOP is None: mergeSOP = nullSOP
-        if transformSOP is None: transformSOP = nullSOP
-        if copySOP is None: copySOP = nullSOP
-        if groupSOP is None: groupSOP = nullSOP
-        if panelCOMP is None: panelCOMP = baseCOMP
-        if webCOMP is None: webCOMP = baseCOMP
-        if switchCOMP is None: switchCOMP = baseCOMP
-        if renderCOMP is None: renderCOMP = baseCOMP
-        if audioCOMP is None: audioCOMP = baseCOMP
-        if mergeCOMP is None: mergeCOMP = baseCOMP
-        if nullCOMP is None: nullCOMP = baseCOMP
-        if glslMAT is None: glslMAT = phongMAT
-        if textureMAT is None: textureMAT = phongMAT
-        if videoMAT is None: videoMAT = phongMAT
+        # Import every type in _TD_TYPES, substituting the fallback for types this version lacks
+        _g = globals()
+        for _name, _fallback in _TD_TYPES:
+            _g[_name] = safe_import_td_type(td, _name) or (_g[_fallback] if _fallback else None)
         
     else:
         TDF = False
@@ -217,13 +153,63 @@ if not TDF:
     panelCOMP = td.panelCOMP; webCOMP = td.webCOMP; switchCOMP = td.switchCOMP; renderCOMP = td.renderCOMP; audioCOMP = td.audioCOMP; mergeCOMP = td.mergeCOMP; nullCOMP = td.nullCOMP
     phongMAT = td.phongMAT; pbrMAT = td.pbrMAT; constantMAT = td.constantMAT; glslMAT = td.glslMAT; textureMAT = td.textureMAT; videoMAT = td.videoMAT
 
-# --- Helper Functions for run() ---
+# Normalized type string -> operator type. Built once at import; each key appears exactly once.
+_COMP_TYPE_MAP = {
+    # DATs
+    "text": textDAT, "table": tableDAT, "script": scriptDAT,
+    "opfind": opfindDAT, "execute": executeDAT, "dat": textDAT,
+
+    # TOPs
+    "circle": circleTOP, "noise": noiseTOP, "moviefilein": moviefileinTOP,
+    "constant": constantTOP, "ramp": rampTOP, "texttop": textTOP,
+    "out": outTOP, "blur": blurTOP, "level": levelTOP, "composite": compositeTOP,
+    "displace": displaceTOP, "feedback": feedbackTOP, "lut": lutTOP,
+
+    # CHOPs
+    "constantchop": constantCHOP, "noisechop": noiseCHOP, "lfo": lfoCHOP,
+    "math": mathCHOP, "selectchop": selectCHOP, "outchop": outCHOP,
+    "filter": filterCHOP, "lag": lagCHOP, "chopexecute": chopexecuteCHOP,
+    "wave": waveCHOP,
+
+    # SOPs
+    "sphere": sphereSOP, "box": boxSOP, "grid": gridSOP, "line": lineSOP,
+    "nullsop": nullSOP, "outsop": outSOP, "tube": tubeSOP,
+    "transform": transformSOP, "copy": copySOP, "group": groupSOP,
+
+    # COMPs
+    "base": baseCOMP, "container": containerCOMP, "geometrycomp": geometryCOMP,
+    "geometry": geometryCOMP, "cameracomp": cameraCOMP, "lightcomp": lightCOMP,
+    "buttoncomp": buttonCOMP, "slidercomp": sliderCOMP, "panel": panelCOMP,
+    "web": webCOMP, "switch": switchCOMP, "audio": audioCOMP, "nullcomp": nullCOMP,
+
+    # MATs
+    "phong": phongMAT, "pbr": pbrMAT, "constantmat": constantMAT,
+    "glsl": glslMAT, "texture": textureMAT, "video": videoMAT,
+
+    # Common aliases ("render" resolves to the output TOP)
+    "render": outTOP, "cam": cameraCOMP, "camera": cameraCOMP,
+    "mov": moviefileinTOP, "movie": moviefileinTOP, "geo": geometryCOMP,
+    "material": phongMAT, "light": lightCOMP, "null": nullSOP,
+
+    # Merge defaults to the SOP version; the family-specific keys pick the others
+    "merge": mergeSOP, "mergesop": mergeSOP, "mergechop": mergeCHOP,
+    "mergetop": compositeTOP, "mergecomp": mergeCOMP,
+}
+
+# Family suffixes and whitespace stripped from a type string before lookup
+_SUFFIX_RE = re.compile(r"comp|sop|top|dat|mat|\s+")
+
+@functools.lru_cache(maxsize=256)
+def _normalize_comp_str(comp_type_str):
+    """Lowercases a type string and strips family suffixes, e.g. 'circleTOP' -> 'circle'."""
+    return _SUFFIX_RE.sub("", comp_type_str.lower())
+
+# --- Helper Functions for the command queue ---
 # These functions run in the main TD thread
 
-def _run_create(params_json):
+def _run_create(params):
     """Creates a component in the main thread."""
     try:
-        params = json.loads(params_json)
         comp_type_str = params.get("type")
         name = params.get("name")
         parent_path = params.get("parent", "/")
@@ -234,50 +220,8 @@ def _run_create(params_json):
 
         if not comp_type_str: raise ValueError("Missing type")
 
-        comp_type_map = {
-            # DATs
-            "text": textDAT, "table": tableDAT, "script": scriptDAT, 
-            "opfind": opfindDAT, "execute": executeDAT, "dat": textDAT,
-            
-            # TOPs
-            "circle": circleTOP, "noise": noiseTOP, "moviefilein": moviefileinTOP,
-            "constant": constantTOP, "ramp": rampTOP, "texttop": textTOP, 
-            "out": outTOP, "blur": blurTOP, "level": levelTOP, "composite": compositeTOP,
-            "displace": displaceTOP, "feedback": feedbackTOP, "lut": lutTOP,
-            
-            # CHOPs
-            "constantchop": constantCHOP, "noisechop": noiseCHOP, "lfo": lfoCHOP,
-            "math": mathCHOP, "selectchop": selectCHOP, "outchop": outCHOP,
-            "filter": filterCHOP, "lag": lagCHOP, "chopexecute": chopexecuteCHOP,
-            "merge": mergeCHOP, "wave": waveCHOP,
-            
-            # SOPs
-            "sphere": sphereSOP, "box": boxSOP, "grid": gridSOP, "line": lineSOP,
-            "nullsop": nullSOP, "outsop": outSOP, "tube": tubeSOP, "merge": mergeSOP,
-            "transform": transformSOP, "copy": copySOP, "group": groupSOP,
-            
-            # COMPs
-            "base": baseCOMP, "container": containerCOMP, "geometrycomp": geometryCOMP,
-            "cameracomp": cameraCOMP, "lightcomp": lightCOMP, "buttoncomp": buttonCOMP,
-            "slidercomp": sliderCOMP, "panel": panelCOMP, "web": webCOMP,
-            "switch": switchCOMP, "render": renderCOMP, "audio": audioCOMP,
-            "merge": mergeCOMP, "nullcomp": nullCOMP,
-            
-            # MATs
-            "phong": phongMAT, "pbr": pbrMAT, "constantmat": constantMAT,
-            "glsl": glslMAT, "texture": textureMAT, "video": videoMAT,
-            
-            # Common aliases
-            "render": outTOP, "cam": cameraCOMP, "camera": cameraCOMP,
-            "mov": moviefileinTOP, "movie": moviefileinTOP, "geo": geometryCOMP,
-            "material": phongMAT, "light": lightCOMP, "null": nullSOP,
-            # Fix merge mapping to use SOP version by default
-            "merge": mergeSOP, "mergesop": mergeSOP, "mergechop": mergeCHOP,
-            "mergetop": compositeTOP, "mergecomp": mergeCOMP
-        }
-        comp_type_key = comp_type_str.lower().replace(" ", "").replace("comp", "").replace("sop", "").replace("top", "").replace("dat", "").replace("mat", "")
-        comp_type = comp_type_map.get(comp_type_key)
-        if comp_type_key == 'geometry': comp_type = geometryCOMP # Special case
+        comp_type_key = _normalize_comp_str(comp_type_str)
+        comp_type = _COMP_TYPE_MAP.get(comp_type_key)
 
         if not comp_type:
             try:
@@ -286,16 +230,17 @@ def _run_create(params_json):
             except Exception: comp_type = None
             if not comp_type: raise ValueError(f"Unsupported type: {comp_type_str}")
 
-        if not name:
-            base_name = comp_type_str.lower().replace("comp", "").replace("sop", "").replace("top", "").replace("dat", "").replace("mat", "")
-            i = 1; name = f"{base_name}{i}";
-            while op(f"{parent_path}/{name}"):
-                i += 1
-                name = f"{base_name}{i}"
-
         parent_op = op(parent_path)
         if not parent_op or not parent_op.valid: raise ValueError(f"Invalid parent: {parent_path}")
 
+        if not name:
+            # Snapshot sibling names once instead of probing op() for every candidate
+            base_name = comp_type_key
+            existing = {child.name for child in parent_op.children}
+            i = 1
+            while f"{base_name}{i}" in existing: i += 1
+            name = f"{base_name}{i}"
+
         # Calculate position for the new node
         nodex = params.get("nodex")
         nodey = params.get("nodey")
@@ -330,9 +275,13 @@ def _run_create(params_json):
             print(f"MCP Run Warning: Failed to position node: {e}")
 
         if properties:
-            for key, value in properties.items():
+            # Fetch every requested parameter with one pars() call instead of a getattr per key
+            try: par_pairs = [(par.name, par) for par in new_op.pars(*properties)]
+            except TypeError: par_pairs = [(key, getattr(new_op.par, key, None)) for key in properties]
+            for key, param_obj in par_pairs:
+                if key not in properties: continue
+                value = properties[key]
                 try:
-                    param_obj = getattr(new_op.par, key, None)
                     if param_obj:
                         current_val = param_obj.val; target_type = type(current_val)
                         try:
@@ -357,19 +306,23 @@ def _run_create(params_json):
             potential_connections = []
             
             if hasattr(parent_op, 'children'):
-                for child in parent_op.children:
+                # Resolve which input parameters exist on the new operator once, not per child
+                candidate_params = []
+                for param_name in ('input1', 'input', 'source', 'top', 'sop', 'chop'):
+                    actual_param = _get_touchdesigner_parameter_name(new_op, param_name)
+                    if hasattr(new_op.par, actual_param): candidate_params.append(actual_param)
+                threshold = current_auto_connection_mode.get('connection_threshold', 20)
+
+                siblings = parent_op.children
+                sibling_count = len(siblings)
+                for idx, child in enumerate(siblings):
                     if child and child.valid and child != new_op:
-                        # Try different input parameters
-                        for param_name in ['input1', 'input', 'source', 'top', 'sop', 'chop']:
+                        for actual_param in candidate_params:
                             try:
-                                # Check if this parameter exists on the new operator
-                                actual_param = _get_touchdesigner_parameter_name(new_op, param_name)
-                                if hasattr(new_op.par, actual_param):
-                                    strength = _get_connection_strength(child, new_op, actual_param)
-                                    threshold = current_auto_connection_mode.get('connection_threshold', 20)
-                                    if strength > threshold:
-                                        potential_connections.append((child.path, actual_param, strength))
-                                        break  # Use first suitable parameter
+                                strength = _get_connection_strength(child, new_op, actual_param, idx, sibling_count)
+                                if strength > threshold:
+                                    potential_connections.append((child.path, actual_param, strength))
+                                    break  # Use first suitable parameter
                             except Exception as param_e:
                                 continue
             
@@ -416,10 +369,29 @@ def _run_create(params_json):
             except Exception as e:
                 print(f"Connection error: {str(e)}")
 
+        _invalidate_context()
         print(f"MCP Run: Created component at {new_op.path}")
     except Exception as e:
         print(f"MCP Run Error (_run_create): {e}")
 
+# Grid layout for auto-positioned nodes
+_GRID_WIDTH = 300
+_GRID_HEIGHT = 150
+_NODES_PER_ROW = 5
+_GRID_ROWS = 10
+
+@functools.lru_cache(maxsize=256)
+def _position_offset(comp_type_lower):
+    """Returns the (dx, dy) offset of a new node from its connection source, by type."""
+    if any(out_type in comp_type_lower for out_type in ('out', 'render')):
+        # Output nodes go to the right
+        return 300, 0
+    if any(proc_type in comp_type_lower for proc_type in ('blur', 'level', 'filter', 'math', 'transform')):
+        # Processing nodes go to the right with slight offset
+        return 250, 50
+    # General nodes go to the right
+    return 200, 0
+
 def _calculate_node_position(parent_op, comp_type_str, connection_source=None):
     """Calculate smart position for new nodes based on workflow context."""
     try:
@@ -432,17 +404,8 @@ def _calculate_node_position(parent_op, comp_type_str, connection_source=None):
                     base_y = getattr(source_op, 'nodeY', 0)
                     
                     # Position based on operator type and workflow
-                    comp_type_lower = comp_type_str.lower()
-                    
-                    if any(out_type in comp_type_lower for out_type in ['out', 'render']):
-                        # Output nodes go to the right
-                        return base_x + 300, base_y
-                    elif any(proc_type in comp_type_lower for proc_type in ['blur', 'level', 'filter', 'math', 'transform']):
-                        # Processing nodes go to the right with slight offset
-                        return base_x + 250, base_y + 50
-                    else:
-                        # General nodes go to the right
-                        return base_x + 200, base_y
+                    dx, dy = _position_offset(comp_type_str.lower())
+                    return base_x + dx, base_y + dy
                         
                 except Exception as pos_e:
                     print(f"Position calculation error: {pos_e}")
@@ -452,39 +415,129 @@ def _calculate_node_position(parent_op, comp_type_str, connection_source=None):
         if not children:
             return 0, 0
         
-        # Create a grid layout for better organization
-        grid_width = 300
-        grid_height = 150
-        nodes_per_row = 5
-        
-        # Find the next available grid position
-        occupied_positions = set()
-        for child in children:
-            if child and child.valid:
-                try:
-                    child_x = getattr(child, 'nodeX', 0)
-                    child_y = getattr(child, 'nodeY', 0)
-                    # Snap to grid
-                    grid_x = round(child_x / grid_width)
-                    grid_y = round(child_y / grid_height)
-                    occupied_positions.add((grid_x, grid_y))
-                except:
-                    pass
+        # Snap each valid child to its grid cell
+        occupied_positions = {(round(getattr(child, 'nodeX', 0) / _GRID_WIDTH), round(getattr(child, 'nodeY', 0) / _GRID_HEIGHT))
+                              for child in children if child and getattr(child, 'valid', False)}
         
         # Find first free grid position
-        for row in range(10):  # Max 10 rows
-            for col in range(nodes_per_row):
+        for row in range(_GRID_ROWS):
+            for col in range(_NODES_PER_ROW):
                 if (col, row) not in occupied_positions:
-                    return col * grid_width, row * grid_height
+                    return col * _GRID_WIDTH, row * _GRID_HEIGHT
         
         # Fallback to original logic
         max_x = max((getattr(child, 'nodeX', 0) for child in children if child and child.valid), default=0)
-        return max_x + grid_width, 0
+        return max_x + _GRID_WIDTH, 0
         
     except Exception as e:
         print(f"Node positioning error: {e}")
         return 0, 0
 
+# Connection priorities and patterns used by _find_best_connection, keyed by normalized type
+_CONNECTION_PATTERNS = {
+    # TOP operators - connect to most relevant TOP
+    'circle': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'constant', 'circle']},
+    'noise': {'target_types': ['TOP'], 'priority': ['out', 'text', 'circle', 'constant']},
+    'constant': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
+    'ramp': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'constant']},
+    'texttop': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
+    'out': {'target_types': ['TOP'], 'priority': ['text', 'noise', 'circle', 'constant']},
+    'blur': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
+    'level': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
+    'composite': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
+    'displace': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
+    'feedback': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
+    'lut': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
+
+    # SOP operators - connect to most relevant SOP
+    'sphere': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'box', 'grid', 'sphere']},
+    'box': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'grid']},
+    'grid': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
+    'line': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
+    'nullsop': {'target_types': ['SOP'], 'priority': ['outsop', 'sphere', 'box', 'grid']},
+    'outsop': {'target_types': ['SOP'], 'priority': ['sphere', 'box', 'grid', 'nullsop']},
+    'tube': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
+    'merge': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},  # Bare 'merge' is the SOP, as in _COMP_TYPE_MAP
+    'mergesop': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
+    'transform': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
+    'copy': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
+    'group': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
+
+    # CHOP operators - connect to most relevant CHOP
+    'constantchop': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'noisechop', 'lfo']},
+    'noisechop': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'lfo']},
+    'lfo': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
+    'math': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
+    'selectchop': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
+    'outchop': {'target_types': ['CHOP'], 'priority': ['constantchop', 'noisechop', 'lfo', 'math']},
+    'filter': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
+    'lag': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
+    'chopexecute': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
+    'mergechop': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
+    'wave': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
+
+    # COMP operators - connect to most relevant COMP
+    'base': {'target_types': ['COMP'], 'priority': ['container', 'geometry', 'camera', 'light']},
+    'container': {'target_types': ['COMP'], 'priority': ['base', 'geometry', 'camera', 'light']},
+    'geometrycomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'camera', 'light']},
+    'cameracomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'geometry']},
+    'lightcomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'geometry', 'camera']},
+    'buttoncomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'panel']},
+    'slidercomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'panel']},
+    'panel': {'target_types': ['COMP'], 'priority': ['base', 'container', 'button', 'slider']},
+    'web': {'target_types': ['COMP'], 'priority': ['base', 'container']},
+    'switch': {'target_types': ['COMP'], 'priority': ['base', 'container']},
+    'render': {'target_types': ['COMP'], 'priority': ['base', 'container', 'geometry']},
+    'audio': {'target_types': ['COMP'], 'priority': ['base', 'container']},
+
+    # MAT operators - connect to most relevant MAT
+    'phong': {'target_types': ['MAT'], 'priority': ['constantmat', 'pbr', 'glsl']},
+    'pbr': {'target_types': ['MAT'], 'priority': ['constantmat', 'phong', 'glsl']},
+    'constantmat': {'target_types': ['MAT'], 'priority': ['phong', 'pbr', 'glsl']},
+    'glsl': {'target_types': ['MAT'], 'priority': ['constantmat', 'phong', 'pbr']},
+    'texture': {'target_types': ['MAT'], 'priority': ['constantmat', 'phong', 'pbr']},
+    'video': {'target_types': ['MAT'], 'priority': ['constantmat', 'phong', 'pbr']}
+}
+
+def _priority_scores(priority):
+    """Pairs each priority token with its score, highest first: ('out', 40), ('text', 30), ..."""
+    return tuple((sys.intern(token), (len(priority) - i) * 10) for i, token in enumerate(priority))
+
+@functools.lru_cache(maxsize=1024)
+def _priority_score(priority_scores, child_type_lower):
+    """Score of the first priority token found in a lowercased child type, or 0."""
+    return next((token_score for token, token_score in priority_scores if token in child_type_lower), 0)
+
+# Family fallbacks for types missing from _CONNECTION_PATTERNS: (keywords, target_types, priority)
+_FAMILY_FALLBACK_PATTERNS = (
+    (('top', 'out'), ('TOP',), ('out', 'text', 'noise', 'circle')),
+    (('sop', 'outsop'), ('SOP',), ('outsop', 'nullsop', 'sphere', 'box')),
+    (('chop', 'outchop'), ('CHOP',), ('outchop', 'nullchop', 'constantchop')),
+    (('comp', 'base'), ('COMP',), ('base', 'container', 'geometry')),
+    (('mat', 'phong'), ('MAT',), ('constantmat', 'phong', 'pbr')),
+)
+
+# Both tables flattened into parallel arrays indexed by a pattern id: the named patterns first, then
+# the family fallbacks. Target types stay upper-case and are matched case-sensitively against
+# child.type, so e.g. 'MAT' doesn't match mathCHOP.
+_PATTERN_IDX = {name: pid for pid, name in enumerate(_CONNECTION_PATTERNS)}
+_PATTERN_TARGET_TYPES = [tuple(pattern['target_types']) for pattern in _CONNECTION_PATTERNS.values()]
+_PATTERN_PRIORITY = [_priority_scores(pattern['priority']) for pattern in _CONNECTION_PATTERNS.values()]
+for _keywords, _target_types, _priority in _FAMILY_FALLBACK_PATTERNS:
+    _PATTERN_TARGET_TYPES.append(_target_types)
+    _PATTERN_PRIORITY.append(_priority_scores(_priority))
+
+# Fallback keyword -> pattern id of the first family listing it. Keywords containing another keyword
+# ('outsop', 'outchop') can never change the result and are dropped; the lookahead finds overlapping
+# hits, so one scan sees every keyword that an any(keyword in new_type) ladder would.
+_FAMILY_KEYWORD_PID = {}
+for _pid, (_keywords, _, _) in enumerate(_FAMILY_FALLBACK_PATTERNS, len(_CONNECTION_PATTERNS)):
+    for _keyword in _keywords:
+        _FAMILY_KEYWORD_PID.setdefault(_keyword, _pid)
+_FAMILY_KEYWORD_PID = {kw: pid for kw, pid in _FAMILY_KEYWORD_PID.items()
+                       if not any(other != kw and other in kw for other in _FAMILY_KEYWORD_PID)}
+_FAMILY_RE = re.compile("(?=(%s))" % "|".join(_FAMILY_KEYWORD_PID))
+
 def _auto_determine_connection(new_op, parent_op, comp_type_str):
     """Automatically determine the best connection for a newly created operator."""
     try:
@@ -505,138 +558,11 @@ def _find_best_connection(new_op, parent_op, comp_type_str):
     """Find the best connection for a new operator based on scene context."""
     try:
         children = [child for child in parent_op.children if child and child.valid and child != new_op]
-        if not children:
-            return None
-        
-        new_type = comp_type_str.lower()
-        
-        # Define connection priorities and patterns
-        connection_patterns = {
-            # TOP operators - connect to most relevant TOP
-            'circle': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'constant', 'circle']},
-            'noise': {'target_types': ['TOP'], 'priority': ['out', 'text', 'circle', 'constant']},
-            'constant': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
-            'ramp': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'constant']},
-            'texttop': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
-            'out': {'target_types': ['TOP'], 'priority': ['text', 'noise', 'circle', 'constant']},
-            'blur': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
-            'level': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
-            'composite': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
-            'displace': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
-            'feedback': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
-            'lut': {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']},
-            
-            # SOP operators - connect to most relevant SOP
-            'sphere': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'box', 'grid', 'sphere']},
-            'box': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'grid']},
-            'grid': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
-            'line': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
-            'nullsop': {'target_types': ['SOP'], 'priority': ['outsop', 'sphere', 'box', 'grid']},
-            'outsop': {'target_types': ['SOP'], 'priority': ['sphere', 'box', 'grid', 'nullsop']},
-            'tube': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
-            'merge': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
-            'transform': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
-            'copy': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
-            'group': {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']},
-            
-            # CHOP operators - connect to most relevant CHOP
-            'constantchop': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'noisechop', 'lfo']},
-            'noisechop': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'lfo']},
-            'lfo': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
-            'math': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
-            'selectchop': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
-            'outchop': {'target_types': ['CHOP'], 'priority': ['constantchop', 'noisechop', 'lfo', 'math']},
-            'filter': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
-            'lag': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
-            'chopexecute': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
-            'merge': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
-            'wave': {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop', 'noisechop']},
-            
-            # COMP operators - connect to most relevant COMP
-            'base': {'target_types': ['COMP'], 'priority': ['container', 'geometry', 'camera', 'light']},
-            'container': {'target_types': ['COMP'], 'priority': ['base', 'geometry', 'camera', 'light']},
-            'geometrycomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'camera', 'light']},
-            'cameracomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'geometry']},
-            'lightcomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'geometry', 'camera']},
-            'buttoncomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'panel']},
-            'slidercomp': {'target_types': ['COMP'], 'priority': ['base', 'container', 'panel']},
-            'panel': {'target_types': ['COMP'], 'priority': ['base', 'container', 'button', 'slider']},
-            'web': {'target_types': ['COMP'], 'priority': ['base', 'container']},
-            'switch': {'target_types': ['COMP'], 'priority': ['base', 'container']},
-            'render': {'target_types': ['COMP'], 'priority': ['base', 'container', 'geometry']},
-            'audio': {'target_types': ['COMP'], 'priority': ['base', 'container']},
-            
-            # MAT operators - connect to most relevant MAT
-            'phong': {'target_types': ['MAT'], 'priority': ['constantmat', 'pbr', 'glsl']},
-            'pbr': {'target_types': ['MAT'], 'priority': ['constantmat', 'phong', 'glsl']},
-            'constantmat': {'target_types': ['MAT'], 'priority': ['phong', 'pbr', 'glsl']},
-            'glsl': {'target_types': ['MAT'], 'priority': ['constantmat', 'phong', 'pbr']},
-            'texture': {'target_types': ['MAT'], 'priority': ['constantmat', 'phong', 'pbr']},
-            'video': {'target_types': ['MAT'], 'priority': ['constantmat', 'phong', 'pbr']}
-        }
-        
-        # Get the pattern for this operator type
-        pattern = connection_patterns.get(new_type)
-        if not pattern:
-            # Fallback: try to match by operator family
-            if any(keyword in new_type for keyword in ['top', 'out']):
-                pattern = {'target_types': ['TOP'], 'priority': ['out', 'text', 'noise', 'circle']}
-            elif any(keyword in new_type for keyword in ['sop', 'outsop']):
-                pattern = {'target_types': ['SOP'], 'priority': ['outsop', 'nullsop', 'sphere', 'box']}
-            elif any(keyword in new_type for keyword in ['chop', 'outchop']):
-                pattern = {'target_types': ['CHOP'], 'priority': ['outchop', 'nullchop', 'constantchop']}
-            elif any(keyword in new_type for keyword in ['comp', 'base']):
-                pattern = {'target_types': ['COMP'], 'priority': ['base', 'container', 'geometry']}
-            elif any(keyword in new_type for keyword in ['mat', 'phong']):
-                pattern = {'target_types': ['MAT'], 'priority': ['constantmat', 'phong', 'pbr']}
-            else:
-                return None
-        
-        # Find compatible children by type
-        compatible_children = []
-        for child in children:
-            if hasattr(child, 'type'):
-                for target_type in pattern['target_types']:
-                    if target_type in child.type:
-                        compatible_children.append(child)
-                        break
-        
-        if not compatible_children:
-            return None
-        
-        # Score children based on priority and recency
-        scored_children = []
-        for child in compatible_children:
-            score = 0
-            child_type_lower = child.type.lower()
-            
-            # Priority scoring
-            for i, priority_type in enumerate(pattern['priority']):
-                if priority_type in child_type_lower:
-                    score += (len(pattern['priority']) - i) * 10  # Higher priority = higher score
-                    break
-            
-            # Recency bonus (more recent = higher score)
-            try:
-                # Try to get creation order or use index
-                recency_bonus = children.index(child)
-                score += (len(children) - recency_bonus) * 5
-            except:
-                pass
-            
-            # Connection availability bonus
-            if _has_available_outputs(child):
-                score += 20
-            
-            scored_children.append((child, score))
-        
-        # Sort by score (highest first)
-        scored_children.sort(key=lambda x: x[1], reverse=True)
-        
-        if scored_children:
-            best_child = scored_children[0][0]
-            print(f"MCP Run: Best connection found: {new_op.path} -> {best_child.path} (score: {scored_children[0][1]})")
-            return best_child.path, 'input1', 'auto'
+        best_child, best_score = _best_scored_child(children, comp_type_str)
+        if best_child is not None:
+            best_path = best_child.path
+            print(f"MCP Run: Best connection found: {new_op.path} -> {best_path} (score: {best_score})")
+            return best_path, 'input1', 'auto'
         
         return None
         
@@ -644,6 +570,53 @@ def _find_best_connection(new_op, parent_op, comp_type_str):
         print(f"Error finding best connection: {e}")
         return None
 
+def _best_scored_child(children, comp_type_str):
+    """Scores candidate children for a type and returns (best_child, score), or (None, -1)."""
+    if not children:
+        return None, -1
+    
+    new_type = comp_type_str.lower()
+    
+    # Get the pattern for this operator type
+    pid = _PATTERN_IDX.get(new_type)
+    if pid is None:
+        # Fallback: try to match by operator family
+        pids = [_FAMILY_KEYWORD_PID[m.group(1)] for m in _FAMILY_RE.finditer(new_type)]
+        if not pids:
+            return None, -1
+        pid = min(pids)
+    target_types = _PATTERN_TARGET_TYPES[pid]
+    priority_scores = _PATTERN_PRIORITY[pid]
+    
+    # Score compatible children in a single pass, keeping only the best so far.
+    # Ties keep the earlier child, as the old stable sort did.
+    best_child, best_score = None, -1
+    child_count = len(children)
+    for idx, child in enumerate(children):
+        child_type = getattr(child, 'type', '')
+        if not any(target_type in child_type for target_type in target_types):
+            continue
+        child_type_lower = child_type.lower()
+        
+        # Priority scoring: the first (highest priority) token found in the type wins
+        score = _priority_score(priority_scores, child_type_lower)
+        
+        # Recency bonus (more recent = higher score)
+        score += (child_count - idx) * 5
+        
+        # Skip the output check when even the availability bonus couldn't beat the best so far
+        if score + 20 <= best_score:
+            continue
+        
+        # Connection availability bonus
+        if _has_available_outputs(child):
+            score += 20
+        
+        if score > best_score:
+            best_child, best_score = child, score
+    
+    return best_child, best_score
+
 def _has_available_outputs(operator):
     """Check if an operator has available outputs for connection."""
     try:
@@ -658,8 +631,35 @@ def _has_available_outputs(operator):
     except:
         return operator.valid
 
-def _get_connection_strength(source_op, target_op, parameter_name):
-    """Calculate connection strength for better auto-connection decisions."""
+# Operator type keywords per family, used to score connection strength
+_TYPE_FAMILIES = {
+    'top': ['circle', 'noise', 'constant', 'text', 'blur', 'level', 'out', 'composite'],
+    'sop': ['sphere', 'box', 'grid', 'transform', 'merge', 'outsop', 'null', 'nullsop'],
+    'chop': ['constantchop', 'noisechop', 'lfo', 'math', 'filter', 'outchop'],
+    'comp': ['geometry', 'camera', 'light', 'render', 'base', 'container'],
+    'mat': ['phong', 'pbr', 'constant', 'glsl', 'texture', 'video']
+}
+
+# Keyword -> families it belongs to (a keyword such as 'constant' can be in several)
+_TYPE_TO_FAMILY = {}
+for _family, _keywords in _TYPE_FAMILIES.items():
+    for _keyword in _keywords: _TYPE_TO_FAMILY.setdefault(_keyword, set()).add(_family)
+
+# Connection strength bonus by target parameter name
+_PARAM_RELEVANCE = {
+    'input1': 40, 'input': 35, 'source': 30, 'top': 25, 'sop': 25, 'chop': 25,
+    'geometry': 20, 'camera': 20, 'material': 15
+}
+
+@functools.lru_cache(maxsize=256)
+def _type_families(type_lower):
+    """Returns the families whose keywords occur in a lowercased operator type."""
+    return frozenset(family for keyword, families in _TYPE_TO_FAMILY.items() if keyword in type_lower for family in families)
+
+def _get_connection_strength(source_op, target_op, parameter_name, source_index=None, sibling_count=None):
+    """Calculate connection strength for better auto-connection decisions.
+
+    Callers walking the parent's children can pass source_index and sibling_count to skip the index scan."""
     try:
         strength = 0
         source_type = getattr(source_op, 'type', '').lower()
@@ -670,35 +670,22 @@ def _get_connection_strength(source_op, target_op, parameter_name):
             strength += 50
         
         # Family compatibility
-        type_families = {
-            'top': ['circle', 'noise', 'constant', 'text', 'blur', 'level', 'out', 'composite'],
-            'sop': ['sphere', 'box', 'grid', 'transform', 'merge', 'outsop', 'null', 'nullsop'],
-            'chop': ['constantchop', 'noisechop', 'lfo', 'math', 'filter', 'outchop'],
-            'comp': ['geometry', 'camera', 'light', 'render', 'base', 'container'],
-            'mat': ['phong', 'pbr', 'constant', 'glsl', 'texture', 'video']
-        }
-        
-        for family, types in type_families.items():
-            if any(t in source_type for t in types) and any(t in target_type for t in types):
-                strength += 30
-                break
+        if _type_families(source_type) & _type_families(target_type):
+            strength += 30
         
         # Parameter name relevance
-        param_relevance = {
-            'input1': 40, 'input': 35, 'source': 30, 'top': 25, 'sop': 25, 'chop': 25,
-            'geometry': 20, 'camera': 20, 'material': 15
-        }
-        
-        strength += param_relevance.get(parameter_name, 10)
+        strength += _PARAM_RELEVANCE.get(parameter_name, 10)
         
         # Recent creation bonus (prefer newer nodes)
         try:
-            parent = source_op.parent()
-            if parent and hasattr(parent, 'children'):
-                children = list(parent.children)
-                source_index = children.index(source_op) if source_op in children else 0
-                recency_bonus = (len(children) - source_index) * 2
-                strength += recency_bonus
+            if source_index is None or sibling_count is None:
+                parent = source_op.parent()
+                if parent and hasattr(parent, 'children'):
+                    children = parent.children
+                    source_index = next((i for i, child in enumerate(children) if child == source_op), 0)
+                    sibling_count = len(children)
+            if sibling_count is not None:
+                strength += (sibling_count - source_index) * 2
         except:
             pass
         
@@ -761,25 +748,29 @@ def _find_input_parameter(new_op):
             'geometry': ['sop', 'input1', 'source'],
         }
         
+        # Snapshot the parameter names once so candidates are set lookups, not par probes
+        pars = _op_pars(new_op)
+        par_names = {par.name for par in pars if par and hasattr(par, 'name')} or None
+        
         # Try type-specific parameters first
         for op_key, param_list in parameter_preferences.items():
             if op_key in op_type:
                 for param_name in param_list:
-                    actual_param = _get_touchdesigner_parameter_name(new_op, param_name)
-                    if hasattr(new_op.par, actual_param):
+                    actual_param = _get_touchdesigner_parameter_name(new_op, param_name, par_names)
+                    if _has_par(new_op, actual_param, par_names):
                         return actual_param
         
         # Fallback to generic detection
         input_params = ['input1', 'input', 'source', 'from', 'top', 'sop', 'chop']
         
         for param_name in input_params:
-            actual_param = _get_touchdesigner_parameter_name(new_op, param_name)
-            if hasattr(new_op.par, actual_param):
+            actual_param = _get_touchdesigner_parameter_name(new_op, param_name, par_names)
+            if _has_par(new_op, actual_param, par_names):
                 return actual_param
         
         # If no standard input found, try to find any parameter that looks like an input
-        if hasattr(new_op, 'pars'):
-            for par in new_op.pars():
+        if pars:
+            for par in pars:
                 if par and hasattr(par, 'name'):
                     param_name = par.name.lower()
                     if any(keyword in param_name for keyword in ['input', 'source', 'from', 'top', 'sop', 'chop']):
@@ -790,9 +781,51 @@ def _find_input_parameter(new_op):
         print(f"Error finding input parameter: {e}")
         return None
 
+# Connection patterns used by _smart_connect, keyed by normalized type: compatible source families
+_SMART_CONNECT_PATTERNS = {
+    # TOP connections
+    'out': {'source_types': ['TOP']},
+    'blur': {'source_types': ['TOP']},
+    'level': {'source_types': ['TOP']},
+    'composite': {'source_types': ['TOP']},
+    'displace': {'source_types': ['TOP']},
+    'feedback': {'source_types': ['TOP']},
+    'lut': {'source_types': ['TOP']},
+
+    # SOP connections
+    'outsop': {'source_types': ['SOP']},
+    'transform': {'source_types': ['SOP']},
+    'copy': {'source_types': ['SOP']},
+    'mergesop': {'source_types': ['SOP']},
+    'group': {'source_types': ['SOP']},
+
+    # CHOP connections
+    'outchop': {'source_types': ['CHOP']},
+    'math': {'source_types': ['CHOP']},
+    'filter': {'source_types': ['CHOP']},
+    'lag': {'source_types': ['CHOP']},
+    'mergechop': {'source_types': ['CHOP']},
+
+    # COMP connections
+    'geometrycomp': {'source_types': ['COMP']},
+    'cameracomp': {'source_types': ['COMP']},
+    'lightcomp': {'source_types': ['COMP']},
+    'render': {'source_types': ['COMP']},
+
+    # MAT connections
+    'phong': {'source_types': ['MAT']},
+    'pbr': {'source_types': ['MAT']},
+    'glsl': {'source_types': ['MAT']},
+    'texture': {'source_types': ['MAT']},
+    'video': {'source_types': ['MAT']}
+}
+
 def _smart_connect(new_op, source_op, connect_parameter):
     """Smart connection based on operator types and available parameters."""
     try:
+        new_path = new_op.path
+        source_path = source_op.path
+        
         # Get the target parameter
         target_par = getattr(new_op.par, connect_parameter, None)
         if not target_par:
@@ -801,15 +834,15 @@ def _smart_connect(new_op, source_op, connect_parameter):
             if best_param:
                 target_par = getattr(new_op.par, best_param, None)
                 connect_parameter = best_param
-                print(f"MCP Run: Using input parameter '{best_param}' for {new_op.path}")
+                print(f"MCP Run: Using input parameter '{best_param}' for {new_path}")
         
         if not target_par:
-            print(f"MCP Run Warning: No suitable input parameter found on {new_op.path}")
+            print(f"MCP Run Warning: No suitable input parameter found on {new_path}")
             # Try to list available parameters for debugging
             try:
-                if hasattr(new_op, 'pars'):
+                if _DEBUG_PAR_MISSES and hasattr(new_op, 'pars'):
                     available_params = [par.name for par in new_op.pars() if par]
-                    print(f"MCP Run Debug: Available parameters on {new_op.path}: {available_params}")
+                    print(f"MCP Run Debug: Available parameters on {new_path}: {available_params}")
             except Exception as debug_e:
                 print(f"MCP Run Debug: Could not list parameters: {debug_e}")
             return
@@ -818,48 +851,9 @@ def _smart_connect(new_op, source_op, connect_parameter):
         new_type = getattr(new_op, 'type', '').lower()
         source_type = getattr(source_op, 'type', '').lower()
         
-        # Define specific connection patterns for better scene building
-        connection_patterns = {
-            # TOP connections
-            'out': {'source_types': ['TOP'], 'expr': "op('{source}')"},
-            'blur': {'source_types': ['TOP'], 'expr': "op('{source}')"},
-            'level': {'source_types': ['TOP'], 'expr': "op('{source}')"},
-            'composite': {'source_types': ['TOP'], 'expr': "op('{source}')"},
-            'displace': {'source_types': ['TOP'], 'expr': "op('{source}')"},
-            'feedback': {'source_types': ['TOP'], 'expr': "op('{source}')"},
-            'lut': {'source_types': ['TOP'], 'expr': "op('{source}')"},
-            
-            # SOP connections
-            'outsop': {'source_types': ['SOP'], 'expr': "op('{source}')"},
-            'transform': {'source_types': ['SOP'], 'expr': "op('{source}')"},
-            'copy': {'source_types': ['SOP'], 'expr': "op('{source}')"},
-            'merge': {'source_types': ['SOP'], 'expr': "op('{source}')"},
-            'group': {'source_types': ['SOP'], 'expr': "op('{source}')"},
-            
-            # CHOP connections
-            'outchop': {'source_types': ['CHOP'], 'expr': "op('{source}')"},
-            'math': {'source_types': ['CHOP'], 'expr': "op('{source}')"},
-            'filter': {'source_types': ['CHOP'], 'expr': "op('{source}')"},
-            'lag': {'source_types': ['CHOP'], 'expr': "op('{source}')"},
-            'merge': {'source_types': ['CHOP'], 'expr': "op('{source}')"},
-            
-            # COMP connections
-            'geometrycomp': {'source_types': ['COMP'], 'expr': "op('{source}')"},
-            'cameracomp': {'source_types': ['COMP'], 'expr': "op('{source}')"},
-            'lightcomp': {'source_types': ['COMP'], 'expr': "op('{source}')"},
-            'render': {'source_types': ['COMP'], 'expr': "op('{source}')"},
-            
-            # MAT connections
-            'phong': {'source_types': ['MAT'], 'expr': "op('{source}')"},
-            'pbr': {'source_types': ['MAT'], 'expr': "op('{source}')"},
-            'glsl': {'source_types': ['MAT'], 'expr': "op('{source}')"},
-            'texture': {'source_types': ['MAT'], 'expr': "op('{source}')"},
-            'video': {'source_types': ['MAT'], 'expr': "op('{source}')"}
-        }
-        
         # Find the best connection pattern
         best_pattern = None
-        for pattern_name, pattern in connection_patterns.items():
+        for pattern_name, pattern in _SMART_CONNECT_PATTERNS.items():
             if pattern_name in new_type:
                 # Check if source type is compatible
                 for source_type_check in pattern['source_types']:
@@ -869,27 +863,19 @@ def _smart_connect(new_op, source_op, connect_parameter):
                 if best_pattern:
                     break
         
-        # Set the connection expression
+        # Set the connection expression; matched patterns and the generic fallback all use an op() reference
+        expr = f"op('{source_path}')"
+        
+        # Rewriting an identical expression still recooks the network, so leave it alone
+        if getattr(target_par, 'expr', None) == expr:
+            print(f"MCP Run: {new_path}.{connect_parameter} already connected to {source_path}")
+            return
+        
+        target_par.expr = expr
         if best_pattern:
-            expr = best_pattern['expr'].format(source=source_op.path)
-            target_par.expr = expr
-            print(f"MCP Run: Smart connected {new_op.path}.{connect_parameter} to {source_op.path} using pattern '{pattern_name}'")
+            print(f"MCP Run: Smart connected {new_path}.{connect_parameter} to {source_path} using pattern '{pattern_name}'")
         else:
-            # Fallback to generic connection
-            if 'TOP' in new_type and 'TOP' in source_type:
-                target_par.expr = f"op('{source_op.path}')"
-            elif 'SOP' in new_type and 'SOP' in source_type:
-                target_par.expr = f"op('{source_op.path}')"
-            elif 'CHOP' in new_type and 'CHOP' in source_type:
-                target_par.expr = f"op('{source_op.path}')"
-            elif 'COMP' in new_type and 'COMP' in source_type:
-                target_par.expr = f"op('{source_op.path}')"
-            elif 'MAT' in new_type and 'MAT' in source_type:
-                target_par.expr = f"op('{source_op.path}')"
-            else:
-                # Generic connection
-                target_par.expr = f"op('{source_op.path}')"
-            print(f"MCP Run: Connected {new_op.path}.{connect_parameter} to {source_op.path} (generic)")
+            print(f"MCP Run: Connected {new_path}.{connect_parameter} to {source_path} (generic)")
         
         # Additional scene building logic
         _enhance_scene_connections(new_op, source_op)
@@ -900,9 +886,11 @@ def _smart_connect(new_op, source_op, connect_parameter):
 def _smart_connect_enhanced(new_op, source_op, connect_parameter):
     """Enhanced smart connection with better expression building."""
     try:
+        new_path = new_op.path
+        source_path = source_op.path
         target_par = getattr(new_op.par, connect_parameter, None)
         if not target_par:
-            print(f"MCP Run Warning: Parameter {connect_parameter} not found on {new_op.path}")
+            print(f"MCP Run Warning: Parameter {connect_parameter} not found on {new_path}")
             return
         
         # Determine optimal connection type
@@ -911,18 +899,18 @@ def _smart_connect_enhanced(new_op, source_op, connect_parameter):
         # Build appropriate expression
         if connection_type == 'value':
             # Extract single value from CHOP
-            target_par.expr = f"op('{source_op.path}')[0]"
+            target_par.expr = f"op('{source_path}')[0]"
         elif connection_type == 'bind':
             # Use binding for object references
-            target_par.expr = f"op('{source_op.path}')"
+            target_par.expr = f"op('{source_path}')"
         else:
             # Direct operator reference
-            target_par.expr = f"op('{source_op.path}')"
+            target_par.expr = f"op('{source_path}')"
         
         # Add some intelligent parameter adjustments
         _apply_intelligent_parameter_adjustments(new_op, source_op, connect_parameter)
         
-        print(f"MCP Run: Enhanced connection {new_op.path}.{connect_parameter} -> {source_op.path} ({connection_type})")
+        print(f"MCP Run: Enhanced connection {new_path}.{connect_parameter} -> {source_path} ({connection_type})")
         
     except Exception as e:
         print(f"Enhanced smart connection error: {e}")
@@ -953,56 +941,77 @@ def _apply_intelligent_parameter_adjustments(new_op, source_op, connect_paramete
     except Exception as e:
         print(f"Parameter adjustment error: {e}")
 
-def _get_touchdesigner_parameter_name(op_obj, param_hint):
+# Direct mapping of common parameter name variations: hint -> candidate TD parameter names
+_PARAM_ALIASES = {
+    # Transform parameters
+    'tx': ['tx', 'transx', 'translatex'],
+    'ty': ['ty', 'transy', 'translatey'],
+    'tz': ['tz', 'transz', 'translatez'],
+    'rx': ['rx', 'rotx', 'rotatex'],
+    'ry': ['ry', 'roty', 'rotatey'],
+    'rz': ['rz', 'rotz', 'rotatez'],
+    'sx': ['sx', 'scalex'],
+    'sy': ['sy', 'scaley'],
+    'sz': ['sz', 'scalez'],
+
+    # Color parameters
+    'colorr': ['colorr', 'r', 'diffuser', 'red'],
+    'colorg': ['colorg', 'g', 'diffuseg', 'green'],
+    'colorb': ['colorb', 'b', 'diffuseb', 'blue'],
+    'colora': ['colora', 'a', 'diffusea', 'alpha'],
+
+    # Geometry parameters
+    'radius': ['radius', 'radx', 'rady', 'radz', 'size'],
+    'scale': ['scale', 'uniform', 's'],
+
+    # Light parameters
+    'intensity': ['intensity', 'dimmer', 'bright'],
+    'lighttype': ['lighttype', 'type'],
+
+    # Material parameters
+    'diffuse': ['diffuse', 'basecolor', 'color'],
+    'specular': ['specular', 'spec'],
+    'roughness': ['roughness', 'rough'],
+    'metallic': ['metallic', 'metal'],
+
+    # Common input parameters
+    'input': ['input', 'input1', 'source', 'top', 'sop', 'chop'],
+}
+
+@functools.lru_cache(maxsize=256)
+def _param_candidates(param_hint):
+    """Returns the ordered TD parameter names to try for a hint, interned for the getattr probes."""
+    return tuple(sys.intern(name) for name in _PARAM_ALIASES.get(param_hint.lower(), (param_hint,)))
+
+def _op_pars(op_obj):
+    """Returns the operator's parameters as a list, or [] if they can't be listed."""
+    try: return list(op_obj.pars())
+    except Exception: return []
+
+def _has_par(op_obj, param_name, par_names=None):
+    """Checks for a parameter, using a par_names snapshot set when the caller has one."""
+    if par_names is not None: return param_name in par_names
+    return hasattr(op_obj.par, param_name)
+
+# (OPType, hint) -> resolved parameter name. Aliases only name built-in (lower-case) parameters,
+# which are the same for every operator of a type; clear it if operator types are reloaded.
+# Keyed on OPType ('circleTOP'), not .type ('circle'), which is shared across families.
+_PAR_NAME_CACHE = {}
+
+def _get_touchdesigner_parameter_name(op_obj, param_hint, par_names=None):
     """Get the actual TouchDesigner parameter name from a hint."""
     try:
-        # Direct mapping of common parameter name variations
-        param_mappings = {
-            # Transform parameters
-            'tx': ['tx', 'transx', 'translatex'],
-            'ty': ['ty', 'transy', 'translatey'], 
-            'tz': ['tz', 'transz', 'translatez'],
-            'rx': ['rx', 'rotx', 'rotatex'],
-            'ry': ['ry', 'roty', 'rotatey'],
-            'rz': ['rz', 'rotz', 'rotatez'],
-            'sx': ['sx', 'scalex'],
-            'sy': ['sy', 'scaley'],
-            'sz': ['sz', 'scalez'],
-            
-            # Color parameters
-            'colorr': ['colorr', 'r', 'diffuser', 'red'],
-            'colorg': ['colorg', 'g', 'diffuseg', 'green'],
-            'colorb': ['colorb', 'b', 'diffuseb', 'blue'],
-            'colora': ['colora', 'a', 'diffusea', 'alpha'],
-            
-            # Geometry parameters
-            'radius': ['radius', 'radx', 'rady', 'radz', 'size'],
-            'scale': ['scale', 'uniform', 's'],
-            
-            # Light parameters
-            'intensity': ['intensity', 'dimmer', 'bright'],
-            'lighttype': ['lighttype', 'type'],
-            
-            # Material parameters
-            'diffuse': ['diffuse', 'basecolor', 'color'],
-            'specular': ['specular', 'spec'],
-            'roughness': ['roughness', 'rough'],
-            'metallic': ['metallic', 'metal'],
-            
-            # Common input parameters
-            'input': ['input', 'input1', 'source', 'top', 'sop', 'chop'],
-        }
-        
-        # Get possible parameter names for this hint
-        possible_names = param_mappings.get(param_hint.lower(), [param_hint])
-        
-        # Try each possible name
-        for param_name in possible_names:
-            if hasattr(op_obj.par, param_name):
-                return param_name
-        
-        # If nothing found, return original hint
-        return param_hint
+        key = (getattr(op_obj, 'OPType', None), param_hint)
+        actual = _PAR_NAME_CACHE.get(key)
+        if actual is not None:
+            return actual
+        
+        # Try each possible name for this hint; if nothing is found, use the original hint
+        actual = next((param_name for param_name in _param_candidates(param_hint)
+                       if _has_par(op_obj, param_name, par_names)), param_hint)
+        if key[0] is not None:
+            _PAR_NAME_CACHE[key] = actual
+        return actual
         
     except Exception as e:
         print(f"Parameter name mapping error: {e}")
@@ -1053,20 +1062,28 @@ def _enhance_scene_connections(new_op, source_op):
 def _setup_camera_for_geometry(camera_op, geometry_op):
     """Setup camera to properly view geometry."""
     try:
+        camera_path = camera_op.path
+        geometry_path = geometry_op.path
+        camera_pars = camera_op.par
+        
         # Set camera to look at geometry
-        if hasattr(camera_op.par, 'lookat'):
-            camera_op.par.lookat.expr = f"op('{geometry_op.path}')"
-            print(f"MCP Run: Camera {camera_op.path} set to look at {geometry_op.path}")
+        lookat = getattr(camera_pars, 'lookat', None)
+        if lookat is not None:
+            lookat.expr = f"op('{geometry_path}')"
+            print(f"MCP Run: Camera {camera_path} set to look at {geometry_path}")
         
         # Position camera appropriately
-        if hasattr(camera_op.par, 'tx'):
-            camera_op.par.tx.val = 0
-        if hasattr(camera_op.par, 'ty'):
-            camera_op.par.ty.val = 2
-        if hasattr(camera_op.par, 'tz'):
-            camera_op.par.tz.val = 5
+        tx = getattr(camera_pars, 'tx', None)
+        if tx is not None:
+            tx.val = 0
+        ty = getattr(camera_pars, 'ty', None)
+        if ty is not None:
+            ty.val = 2
+        tz = getattr(camera_pars, 'tz', None)
+        if tz is not None:
+            tz.val = 5
             
-        print(f"MCP Run: Camera {camera_op.path} positioned for viewing")
+        print(f"MCP Run: Camera {camera_path} positioned for viewing")
         
     except Exception as e:
         print(f"Camera setup error: {e}")
@@ -1074,53 +1091,74 @@ def _setup_camera_for_geometry(camera_op, geometry_op):
 def _setup_light_for_geometry(light_op, geometry_op):
     """Setup light to properly illuminate geometry."""
     try:
+        light_pars = light_op.par
+        
         # Position light to illuminate geometry
-        if hasattr(light_op.par, 'tx'):
-            light_op.par.tx.val = 3
-        if hasattr(light_op.par, 'ty'):
-            light_op.par.ty.val = 2
-        if hasattr(light_op.par, 'tz'):
-            light_op.par.tz.val = 2
+        tx = getattr(light_pars, 'tx', None)
+        if tx is not None:
+            tx.val = 3
+        ty = getattr(light_pars, 'ty', None)
+        if ty is not None:
+            ty.val = 2
+        tz = getattr(light_pars, 'tz', None)
+        if tz is not None:
+            tz.val = 2
             
         # Set light intensity
-        if hasattr(light_op.par, 'intensity'):
-            light_op.par.intensity.val = 1.0
+        intensity = getattr(light_pars, 'intensity', None)
+        if intensity is not None:
+            intensity.val = 1.0
             
         print(f"MCP Run: Light {light_op.path} positioned to illuminate {geometry_op.path}")
         
     except Exception as e:
         print(f"Light setup error: {e}")
 
+# Type keywords that mark a child as renderable geometry
+_GEO_KEYWORDS = ('sphere', 'box', 'grid', 'geometry')
+
 def _setup_render_for_scene(render_op, parent_op):
     """Setup render component for complete scene."""
     try:
+        render_path = render_op.path
+        render_pars = render_op.par
+        
         # Find camera and geometry in parent
         camera_op = None
         geometry_op = None
         
-        for child in parent_op.children:
-            if child and child.valid:
-                child_type = getattr(child, 'type', '').lower()
-                if 'camera' in child_type:
-                    camera_op = child
-                elif any(geo in child_type for geo in ['sphere', 'box', 'grid', 'geometry']):
-                    geometry_op = child
+        # Walk from the newest child so the last match of each kind wins, and stop once both are found
+        for child in reversed(parent_op.children):
+            if child is None or not child.valid:
+                continue
+            child_type = getattr(child, 'type', '').lower()
+            if 'camera' in child_type:
+                if camera_op is None: camera_op = child
+            elif any(geo in child_type for geo in _GEO_KEYWORDS):
+                if geometry_op is None: geometry_op = child
+            if camera_op is not None and geometry_op is not None:
+                break
         
         # Connect render to camera
-        if camera_op and hasattr(render_op.par, 'camera'):
-            render_op.par.camera.expr = f"op('{camera_op.path}')"
-            print(f"MCP Run: Render {render_op.path} connected to camera {camera_op.path}")
+        camera_par = getattr(render_pars, 'camera', None)
+        if camera_op and camera_par is not None:
+            camera_path = camera_op.path
+            camera_par.expr = f"op('{camera_path}')"
+            print(f"MCP Run: Render {render_path} connected to camera {camera_path}")
         
         # Connect render to geometry
-        if geometry_op and hasattr(render_op.par, 'geometry'):
-            render_op.par.geometry.expr = f"op('{geometry_op.path}')"
-            print(f"MCP Run: Render {render_op.path} connected to geometry {geometry_op.path}")
+        geometry_par = getattr(render_pars, 'geometry', None)
+        if geometry_op and geometry_par is not None:
+            geometry_path = geometry_op.path
+            geometry_par.expr = f"op('{geometry_path}')"
+            print(f"MCP Run: Render {render_path} connected to geometry {geometry_path}")
         
         # Set render resolution
-        if hasattr(render_op.par, 'resolution'):
-            render_op.par.resolution.val = 1  # HD resolution
+        resolution = getattr(render_pars, 'resolution', None)
+        if resolution is not None:
+            resolution.val = 1  # HD resolution
         
-        print(f"MCP Run: Render {render_op.path} configured for complete scene")
+        print(f"MCP Run: Render {render_path} configured for complete scene")
         
     except Exception as e:
         print(f"Render setup error: {e}")
@@ -1128,18 +1166,25 @@ def _setup_render_for_scene(render_op, parent_op):
 def _apply_material_to_geometry(material_op, geometry_op):
     """Apply material to geometry."""
     try:
+        material_path = material_op.path
+        geometry_path = geometry_op.path
+        
         # Connect material to geometry
-        if hasattr(geometry_op.par, 'material'):
-            geometry_op.par.material.expr = f"op('{material_op.path}')"
-            print(f"MCP Run: Material {material_op.path} applied to {geometry_op.path}")
+        material_par = getattr(geometry_op.par, 'material', None)
+        if material_par is not None:
+            material_par.expr = f"op('{material_path}')"
+            print(f"MCP Run: Material {material_path} applied to {geometry_path}")
         
         # Set material properties
-        if hasattr(material_op.par, 'diffuse'):
-            material_op.par.diffuse.val = 0.8
-        if hasattr(material_op.par, 'specular'):
-            material_op.par.specular.val = 0.2
+        material_pars = material_op.par
+        diffuse = getattr(material_pars, 'diffuse', None)
+        if diffuse is not None:
+            diffuse.val = 0.8
+        specular = getattr(material_pars, 'specular', None)
+        if specular is not None:
+            specular.val = 0.2
             
-        print(f"MCP Run: Material {material_op.path} configured for {geometry_op.path}")
+        print(f"MCP Run: Material {material_path} configured for {geometry_path}")
         
     except Exception as e:
         print(f"Material application error: {e}")
@@ -1147,29 +1192,37 @@ def _apply_material_to_geometry(material_op, geometry_op):
 def _connect_geometry_to_visualization(geometry_op, parent_op):
     """Connect geometry to existing camera and render components."""
     try:
+        geometry_path = geometry_op.path
+        
         # Find existing camera and render
         camera_op = None
         render_op = None
         
-        for child in parent_op.children:
-            if child and child.valid and child != geometry_op:
-                child_type = getattr(child, 'type', '').lower()
-                if 'camera' in child_type:
-                    camera_op = child
-                elif 'render' in child_type:
-                    render_op = child
+        # Walk from the newest child so the last match of each kind wins, and stop once both are found
+        for child in reversed(parent_op.children):
+            if child is None or not child.valid or child == geometry_op:
+                continue
+            child_type = getattr(child, 'type', '').lower()
+            if 'camera' in child_type:
+                if camera_op is None: camera_op = child
+            elif 'render' in child_type:
+                if render_op is None: render_op = child
+            if camera_op is not None and render_op is not None:
+                break
         
         # Connect camera to geometry
-        if camera_op and hasattr(camera_op.par, 'lookat'):
-            camera_op.par.lookat.expr = f"op('{geometry_op.path}')"
-            print(f"MCP Run: Camera {camera_op.path} now looking at {geometry_op.path}")
+        lookat = getattr(camera_op.par, 'lookat', None) if camera_op else None
+        if lookat is not None:
+            lookat.expr = f"op('{geometry_path}')"
+            print(f"MCP Run: Camera {camera_op.path} now looking at {geometry_path}")
         
         # Connect render to geometry
-        if render_op and hasattr(render_op.par, 'geometry'):
-            render_op.par.geometry.expr = f"op('{geometry_op.path}')"
-            print(f"MCP Run: Render {render_op.path} now rendering {geometry_op.path}")
+        geometry_par = getattr(render_op.par, 'geometry', None) if render_op else None
+        if geometry_par is not None:
+            geometry_par.expr = f"op('{geometry_path}')"
+            print(f"MCP Run: Render {render_op.path} now rendering {geometry_path}")
         
-        print(f"MCP Run: Geometry {geometry_op.path} connected to visualization pipeline")
+        print(f"MCP Run: Geometry {geometry_path} connected to visualization pipeline")
         
     except Exception as e:
         print(f"Geometry visualization connection error: {e}")
@@ -1177,29 +1230,32 @@ def _connect_geometry_to_visualization(geometry_op, parent_op):
 def _connect_output_to_render(output_op, parent_op):
     """Connect output TOP to render component."""
     try:
+        output_path = output_op.path
+        
         # Find render component
         render_op = None
         for child in parent_op.children:
-            if child and child.valid and child != output_op:
-                child_type = getattr(child, 'type', '').lower()
-                if 'render' in child_type:
-                    render_op = child
-                    break
+            if child is None or not child.valid or child == output_op:
+                continue
+            if 'render' in getattr(child, 'type', '').lower():
+                render_op = child
+                break
         
         # Connect render output to final output
-        if render_op and hasattr(output_op.par, 'input1'):
-            output_op.par.input1.expr = f"op('{render_op.path}')"
-            print(f"MCP Run: Render {render_op.path} connected to output {output_op.path}")
+        input1 = getattr(output_op.par, 'input1', None) if render_op else None
+        if input1 is not None:
+            render_path = render_op.path
+            input1.expr = f"op('{render_path}')"
+            print(f"MCP Run: Render {render_path} connected to output {output_path}")
         
-        print(f"MCP Run: Output {output_op.path} connected to visualization pipeline")
+        print(f"MCP Run: Output {output_path} connected to visualization pipeline")
         
     except Exception as e:
         print(f"Output render connection error: {e}")
 
-def _run_delete(params_json):
+def _run_delete(params):
     """Deletes a component in the main thread."""
     try:
-        params = json.loads(params_json)
         path = params.get("path")
         if not path: raise ValueError("Missing path")
         component = op(path)
@@ -1207,14 +1263,26 @@ def _run_delete(params_json):
         parent = component.parent(); name = component.name
         component.destroy()
         parent_path = parent.path if parent and parent.valid else "(invalid)"
+        _invalidate_context()
         print(f"MCP Run: Deleted {name} from {parent_path}")
     except Exception as e:
         print(f"MCP Run Error (_run_delete): {e}")
 
-def _run_set(params_json):
+# When set, parameter misses in _run_set and _smart_connect also list the operator's parameters
+_DEBUG_PAR_MISSES = False
+
+def set_debug_par_misses(enabled):
+    """Turn the parameter listing on parameter-not-found errors on or off."""
+    global _DEBUG_PAR_MISSES
+    _DEBUG_PAR_MISSES = bool(enabled)
+    print(f"MCP Run: Parameter miss debugging {'enabled' if _DEBUG_PAR_MISSES else 'disabled'}")
+
+# Values containing any of these are set as parameter expressions rather than constants
+_EXPR_RE = re.compile(r"time|sin|cos|op\(")
+
+def _run_set(params):
     """Sets a parameter in the main thread."""
     try:
-        params = json.loads(params_json)
         path = params.get("path"); parameter = params.get("parameter"); value_str = params.get("value")
         if not path or not parameter or value_str is None: raise ValueError("Missing params")
         component = op(path)
@@ -1226,7 +1294,7 @@ def _run_set(params_json):
         
         if param_obj:
             # Check if it's an expression or direct value
-            if isinstance(value_str, str) and ('time' in value_str or 'sin' in value_str or 'cos' in value_str or 'op(' in value_str):
+            if isinstance(value_str, str) and _EXPR_RE.search(value_str):
                 # Set as expression
                 param_obj.expr = value_str
                 print(f"MCP Run: Set {actual_param_name} expression '{value_str}' on {path}")
@@ -1241,6 +1309,8 @@ def _run_set(params_json):
                 except ValueError: value = str(value_str)
                 param_obj.val = value
                 print(f"MCP Run: Set {actual_param_name}={value} on {path}")
+        elif not _DEBUG_PAR_MISSES:
+            print(f"MCP Run Error: Parameter '{parameter}' (tried '{actual_param_name}') not found on {path}")
         else: 
             # List available parameters for debugging
             try:
@@ -1255,10 +1325,12 @@ def _run_set(params_json):
     except Exception as e:
         print(f"MCP Run Error (_run_set): {e}")
 
-def _run_execute(params_json):
+# Result types that are always JSON-serializable as-is
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+def _run_execute(params):
     """Executes Python code in the main thread."""
     try:
-        params = json.loads(params_json)
         code = params.get("code"); context_path = params.get("context")
         if not code: raise ValueError("Missing code")
         exec_globals = globals().copy(); exec_locals = {}
@@ -1267,37 +1339,32 @@ def _run_execute(params_json):
             context_op = op(context_path) if context_path else op("/")
             if context_op and context_op.valid: exec_globals["me"] = context_op
             else: exec_globals["me"] = op("/")
-
-            # --- Add this section to explicitly include imported TD types ---
-            td_types_to_include = [
-                textDAT, tableDAT, scriptDAT, opfindDAT, executeDAT,
-                circleTOP, noiseTOP, moviefileinTOP, constantTOP, rampTOP, textTOP, outTOP,
-                constantCHOP, noiseCHOP, lfoCHOP, mathCHOP, selectCHOP, outCHOP, audioDeviceInCHOP,
-                sphereSOP, boxSOP, gridSOP, lineSOP, nullSOP, outSOP,
-                baseCOMP, containerCOMP, geometryCOMP, cameraCOMP, lightCOMP, buttonCOMP, sliderCOMP,
-                panelCOMP, webCOMP, switchCOMP, renderCOMP, audioCOMP, mergeCOMP, nullCOMP,
-                phongMAT, pbrMAT, constantMAT
-                # Add any other specific types you import and want accessible directly by name
-            ]
-            for td_type in td_types_to_include:
-                if hasattr(td_type, '__name__'): # Ensure it's a valid type/class
-                     exec_globals[td_type.__name__] = td_type
-            # --- End of added section ---
+            # The imported TD types are module globals (see _TD_TYPES), so the copy already has them
 
         exec(code, exec_globals, exec_locals)
         result_val = exec_locals.get("result", "Python code executed via run().")
-        if isinstance(result_val, (td.OP, td.Parameter, td.ParGroup)): result_str = str(result_val)
+        if isinstance(result_val, _JSON_SCALARS): result_str = result_val
+        elif isinstance(result_val, (td.OP, td.Parameter, td.ParGroup)): result_str = str(result_val)
         else:
-            try: json.dumps(result_val); result_str = result_val
+            # Only containers and unknown objects need the serializability probe
+            try: _dumps(result_val); result_str = result_val
             except TypeError: result_str = str(result_val)
         print(f"MCP Run: Executed Python. Result: {result_str}")
     except Exception as e:
         print(f"MCP Run Error (_run_execute): {e}")
 
-def _run_list(params_json):
+def _print_result(label, path, data):
+    """Serializes a list/get result and prints it to the Textport, in order with the other MCP Run lines."""
+    try: print(f"MCP Run {label} Result ({path}): {_dumps(data).decode()}")
+    except Exception as e: print(f"MCP Run Error (_print_result): {e}")
+
+# Reads (type, name, path) off a child in one call
+_CHILD_TNP = operator.attrgetter('type', 'name', 'path')
+_PAR_NAME = operator.attrgetter('name')
+
+def _run_list(params):
     """Lists components in the main thread."""
     try:
-        params = json.loads(params_json)
         path = params.get("path", "/"); type_filter = params.get("type")
         target_op = op(path)
         if not target_op or not target_op.valid: print(f"MCP Run List Warning: Path invalid {path}"); return
@@ -1305,35 +1372,121 @@ def _run_list(params_json):
         if hasattr(target_op, 'children'):
             for child in target_op.children:
                 if child and child.valid:
-                    child_type = getattr(child, 'type', 'N/A'); child_name = getattr(child, 'name', 'N/A'); child_path = getattr(child, 'path', 'N/A')
+                    try: child_type, child_name, child_path = _CHILD_TNP(child)
+                    except AttributeError: child_type = getattr(child, 'type', 'N/A'); child_name = getattr(child, 'name', 'N/A'); child_path = getattr(child, 'path', 'N/A')
                     if not type_filter or child_type == type_filter: components.append({"path": child_path, "type": child_type, "name": child_name})
-        print(f"MCP Run List Result ({path}): {json.dumps(components)}")
+        _print_result("List", path, components)
     except Exception as e:
         print(f"MCP Run Error (_run_list): {e}")
 
-def _run_get(params_json):
+def _run_get(params):
     """Gets component/parameter info in the main thread."""
     try:
-        params = json.loads(params_json)
         path = params.get("path"); parameter = params.get("parameter")
         if not path: raise ValueError("Missing path")
         op_obj = op(path)
         if not op_obj or not op_obj.valid:
             result = {"path": path, "exists": False, "error": "Component not found or invalid"}
         elif parameter:
+            # Request strings aren't interned; interning makes the attribute probe an identity compare
+            parameter = sys.intern(str(parameter))
             param_obj = getattr(op_obj.par, parameter, None)
             if param_obj is not None:
                  val = param_obj.eval(); val_str = str(val) if isinstance(val, (td.OP, td.Parameter, td.ParGroup)) else val
                  result = {"path": path, "exists": True, "parameter": parameter, "value": val_str, "type": type(val).__name__}
             else: result = {"path": path, "exists": True, "parameter": parameter, "error": "Parameter not found"}
         else:
-            param_list = [p.name for p in op_obj.pars()] if hasattr(op_obj, "pars") else []
+            pars_fn = getattr(op_obj, "pars", None)
+            param_list = list(map(_PAR_NAME, pars_fn())) if pars_fn is not None else []
             result = {"path": path, "exists": True, "type": op_obj.type if hasattr(op_obj, "type") else "N/A", "name": op_obj.name if hasattr(op_obj, "name") else "N/A", "parameters": param_list}
-        print(f"MCP Run Get Result ({path}): {json.dumps(result)}")
+        _print_result("Get", path, result)
     except Exception as e:
         print(f"MCP Run Error (_run_get): {e}")
 
 
+# --- Main-Thread Command Queue ---
+# HTTP threads enqueue (op_name, params) and a single scheduled tick drains them in the main TD thread
+
+_cmd_queue = queue.SimpleQueue()  # Unbounded C-level FIFO: put() never blocks an HTTP thread
+_tick_lock = threading.Lock()
+_tick_scheduled = False
+
+# Operation name -> main-thread helper, used by _drain_cmds
+_CMD_DISPATCH = {
+    "create": _run_create,
+    "delete": _run_delete,
+    "set": _run_set,
+    "execute": _run_execute,
+    "list": _run_list,
+    "get": _run_get,
+}
+
+def _enqueue_cmd(op_name, params, dat_path):
+    """Queues a command for the main thread, scheduling a drain only if none is pending."""
+    global _tick_scheduled
+    if op_name in _WRITE_CMDS: _invalidate_reads()
+    if not TDF:
+        # The mock run() only prints, so nothing would ever drain the queue; run the command here instead
+        _CMD_DISPATCH[op_name](params); return
+    _cmd_queue.put((op_name, params))
+    with _tick_lock:
+        if _tick_scheduled: return
+        _tick_scheduled = True
+    # delayFrames=0 runs the drain at the end of the current frame rather than a frame later
+    try: run(_drain_script(dat_path), delayFrames=0)
+    except Exception:
+        # Let the next command schedule a drain instead of leaving the queue stalled
+        with _tick_lock: _tick_scheduled = False
+        raise
+
+@functools.lru_cache(maxsize=8)
+def _drain_script(dat_path):
+    """The run() source that drains the queue for a server DAT; built once per DAT path."""
+    return f"mod('{dat_path}')._drain_cmds()"
+
+# Repeated list/get reads within _READ_CACHE_TTL seconds are not requeued.
+# (op_name, normalized path, repr(filter)) -> time.monotonic() when last queued. Cleared whenever a
+# write is queued, so a read queued after a write always runs after it and prints the new state.
+_READ_CACHE_TTL = 0.5
+_READ_CACHE_SIZE = 256
+_list_cache = {}
+_list_cache_lock = threading.Lock()
+
+# Commands that can change what a list/get prints; execute_python can change anything
+_WRITE_CMDS = frozenset(("create", "delete", "set", "execute"))
+
+def _read_path(path):
+    """Normalizes an operator path for read dedupe: '/p1/', '/p1' and '//p1' are the same read."""
+    path = str(path)
+    return ("/" if path.startswith("/") else "") + "/".join(part for part in path.split("/") if part)
+
+def _recently_queued(op_name, path, detail):
+    """Returns True if the same read was queued within the TTL, otherwise records it as queued now."""
+    now = time.monotonic(); key = (op_name, _read_path(path), repr(detail))
+    with _list_cache_lock:
+        queued_at = _list_cache.get(key)
+        if queued_at is not None and now - queued_at < _READ_CACHE_TTL: return True
+        if len(_list_cache) >= _READ_CACHE_SIZE:
+            for stale in [k for k, t in _list_cache.items() if now - t >= _READ_CACHE_TTL]: del _list_cache[stale]
+            if len(_list_cache) >= _READ_CACHE_SIZE: _list_cache.clear()
+        _list_cache[key] = now
+    return False
+
+def _invalidate_reads():
+    """Forgets every recently queued read; called as a write is queued."""
+    with _list_cache_lock: _list_cache.clear()
+
+def _drain_cmds():
+    """Runs every queued command in the main thread."""
+    global _tick_scheduled
+    # Clear the flag first so commands queued while draining schedule a fresh tick
+    with _tick_lock: _tick_scheduled = False
+    while True:
+        try: op_name, params = _cmd_queue.get_nowait()
+        except queue.Empty: return
+        _CMD_DISPATCH[op_name](params)
+
+
 # --- Auto-Connection Configuration ---
 
 # Configuration for different auto-connection modes
@@ -1370,12 +1523,14 @@ AUTO_CONNECTION_MODES = {
 
 # Default mode
 current_auto_connection_mode = AUTO_CONNECTION_MODES['intelligent']
+current_auto_connection_mode_name = 'intelligent'
 
 def set_auto_connection_mode(mode_name):
     """Set the auto-connection mode globally."""
-    global current_auto_connection_mode
+    global current_auto_connection_mode, current_auto_connection_mode_name
     if mode_name in AUTO_CONNECTION_MODES:
         current_auto_connection_mode = AUTO_CONNECTION_MODES[mode_name]
+        current_auto_connection_mode_name = mode_name
         print(f"MCP Run: Auto-connection mode set to '{mode_name}'")
         return True
     else:
@@ -1384,6 +1539,9 @@ def set_auto_connection_mode(mode_name):
 
 def get_auto_connection_mode():
     """Get the current auto-connection mode."""
+    # Fast path: the mode was last set by name and hasn't been replaced since
+    if current_auto_connection_mode is AUTO_CONNECTION_MODES.get(current_auto_connection_mode_name):
+        return current_auto_connection_mode_name
     for mode_name, config in AUTO_CONNECTION_MODES.items():
         if config == current_auto_connection_mode:
             return mode_name
@@ -1395,29 +1553,24 @@ def test_auto_connection_system():
     print("="*50)
     
     try:
+        # Each create runs on its own successive frame, which keeps them in order without blocking
+        delay = 0
+        def create_chain(chain):
+            nonlocal delay
+            for comp_type, name in chain:
+                delay += 1
+                run(f"op('/').create({comp_type}, '{name}')", delayFrames=delay)
+        
         # Test 1: Create a basic visualization chain
         print("Test 1: Creating visualization chain...")
-        run("op('/').create(sphereSOP, 'test_sphere')")
-        time.sleep(0.1)
-        run("op('/').create(cameraCOMP, 'test_camera')")
-        time.sleep(0.1)
-        run("op('/').create(renderCOMP, 'test_render')")
-        time.sleep(0.1)
-        run("op('/').create(outTOP, 'test_out')")
+        create_chain([('sphereSOP', 'test_sphere'), ('cameraCOMP', 'test_camera'),
+                      ('renderCOMP', 'test_render'), ('outTOP', 'test_out')])
         
         print("\nTest 2: Creating audio processing chain...")
-        run("op('/').create(noiseCHOP, 'test_noise')")
-        time.sleep(0.1)
-        run("op('/').create(filterCHOP, 'test_filter')")
-        time.sleep(0.1)
-        run("op('/').create(outCHOP, 'test_audio_out')")
+        create_chain([('noiseCHOP', 'test_noise'), ('filterCHOP', 'test_filter'), ('outCHOP', 'test_audio_out')])
         
         print("\nTest 3: Creating generative visual chain...")
-        run("op('/').create(lfoCHOP, 'test_lfo')")
-        time.sleep(0.1)
-        run("op('/').create(circleTOP, 'test_circle')")
-        time.sleep(0.1)
-        run("op('/').create(feedbackTOP, 'test_feedback')")
+        create_chain([('lfoCHOP', 'test_lfo'), ('circleTOP', 'test_circle'), ('feedbackTOP', 'test_feedback')])
         
         print("\nAuto-connection test completed!")
         print("Check the network editor to see the intelligent connections.")
@@ -1437,14 +1590,20 @@ def debug_operator_parameters(op_path):
         print(f"\nParameters for {op_path} ({op_obj.type}):")
         print("="*50)
         
-        if hasattr(op_obj, 'pars'):
-            params = [(par.name, type(par.val).__name__, str(par.val)[:50]) for par in op_obj.pars() if par and hasattr(par, 'name')]
+        params = []
+        pars_fn = getattr(op_obj, 'pars', None)
+        if pars_fn is not None:
+            for par in pars_fn():
+                name = getattr(par, 'name', None) if par else None
+                if name is None: continue
+                val = par.val
+                params.append((name, type(val).__name__, str(val)[:50]))
             for name, param_type, value in params:
                 print(f"  {name:<20} [{param_type:<8}] = {value}")
         else:
             print("  No parameters found")
             
-        print(f"\nTotal parameters: {len(params) if 'params' in locals() else 0}")
+        print(f"\nTotal parameters: {len(params)}")
         
     except Exception as e:
         print(f"Debug error for {op_path}: {e}")
@@ -1463,15 +1622,15 @@ def test_parameter_fixes():
         'lighttype': 'light type'
     }
     
+    # Test on different operator types, resolving each path once rather than once per hint
+    test_operators = ['/MainSphere', '/SphereTransform', '/MainLight', '/MainCamera']
+    resolved = {op_path: op(op_path) for op_path in test_operators}
+    
     for param_hint, description in test_mappings.items():
         print(f"Testing {description} ({param_hint}):")
         
-        # Test on different operator types
-        test_operators = ['/MainSphere', '/SphereTransform', '/MainLight', '/MainCamera']
-        
-        for op_path in test_operators:
+        for op_path, test_op in resolved.items():
             try:
-                test_op = op(op_path)
                 if test_op and test_op.valid:
                     actual_param = _get_touchdesigner_parameter_name(test_op, param_hint)
                     has_param = hasattr(test_op.par, actual_param)
@@ -1492,8 +1651,9 @@ def cleanup_test_nodes():
     for node_name in test_nodes:
         try:
             node_path = f"/{node_name}"
-            if op(node_path) and op(node_path).valid:
-                run(f"op('{node_path}').destroy()")
+            node = op(node_path)
+            if node and node.valid:
+                _run_delete({"path": node_path})
                 print(f"Removed: {node_name}")
         except Exception as e:
             print(f"Could not remove {node_name}: {e}")
@@ -1506,12 +1666,15 @@ def test_connection_fixes():
     print("="*60)
     
     try:
+        # Resolve every operator the tests touch once, up front
+        resolved = {op_path: op(op_path) for op_path in ('/MainSphere', '/SphereTransform', '/MainLight', '/SceneMerge', '/OUT')}
+        
         # Test 1: Parameter name mapping
         print("\n1. Testing parameter name mapping...")
         test_operators = ['/MainSphere', '/SphereTransform', '/MainLight']
         
         for op_path in test_operators:
-            test_op = op(op_path)
+            test_op = resolved[op_path]
             if test_op and test_op.valid:
                 print(f"\n  {op_path} ({test_op.type}):")
                 # Test common parameter mappings
@@ -1524,9 +1687,9 @@ def test_connection_fixes():
         
         # Test 2: Connection strength calculation
         print("\n2. Testing connection strength calculation...")
-        sphere = op('/MainSphere')
-        transform = op('/SphereTransform') 
-        merge = op('/SceneMerge')
+        sphere = resolved['/MainSphere']
+        transform = resolved['/SphereTransform']
+        merge = resolved['/SceneMerge']
         
         if sphere and transform and merge:
             # Test sphere -> transform connection
@@ -1546,7 +1709,7 @@ def test_connection_fixes():
         test_ops = ['/SphereTransform', '/SceneMerge', '/OUT']
         
         for op_path in test_ops:
-            test_op = op(op_path)
+            test_op = resolved[op_path]
             if test_op and test_op.valid:
                 best_input = _find_input_parameter(test_op)
                 print(f"  {op_path:<20} best input: {best_input}")
@@ -1562,58 +1725,225 @@ def test_connection_fixes():
 # Global server state
 server_thread = None
 server_instance = None
-server_running = False
+_server_lock = threading.RLock()    # Serializes start/stop so server state can't tear
+
+class ServerState(enum.Enum):
+    STOPPED = "stopped"
+    STARTING = "starting"
+    RUNNING = "running"
+    STOPPING = "stopping"
+
+_server_state = ServerState.STOPPED  # Only changed while holding _server_lock
+_shutdown_event = threading.Event() # Set while stopping; requests still in flight get a 503
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 8053  # Changed to 8053 to avoid conflict
+MOCK_DAT_PATH = "/mock/text1"  # Reported as the DAT path when running outside TouchDesigner
+
+# Fixed per-server settings, set once on the handler class when the server starts
+ServerConfig = collections.namedtuple("ServerConfig", "dat_path")
+
+SERVER_MAX_WORKERS = 8  # Requests only queue work for TD, so a small fixed pool is enough
+SERVER_REQUEST_TIMEOUT = 10  # Seconds a worker waits on a silent client socket before giving up
+
+# While the server is up, request threads log through a queue and a listener thread does the textport
+# writes; otherwise records are written directly. Per-request "Received ..." lines are DEBUG;
+# _log.setLevel(logging.DEBUG) shows them.
+_log_q = queue.SimpleQueue()
+_log_stream = logging.StreamHandler(sys.stdout)
+_log = logging.getLogger("td_mcp")
+# The logger outlives a re-executed DAT: stop the previous execution's listener, and replace its handlers
+if getattr(_log, "mcp_listener", None) is not None: _log.mcp_listener.stop()
+_log.mcp_listener = None
+_log.handlers[:] = [_log_stream]
+_log.setLevel(logging.INFO)
+_log.propagate = False
 
 class ThreadingHTTPServer(HTTPServer):
-    """Allow storing DAT path."""
-    def __init__(self, server_address, RequestHandlerClass, dat_path, bind_and_activate=True):
+    """Handles requests on a bounded worker pool."""
+    # Listen backlog; the socketserver default of 5 refuses bursts of concurrent clients before the pool sees them
+    request_queue_size = SERVER_MAX_WORKERS * 4
+
+    def __init__(self, server_address, RequestHandlerClass, bind_and_activate=True):
+        # Created first: a failed bind calls server_close() from inside HTTPServer.__init__
+        self.executor = ThreadPoolExecutor(max_workers=SERVER_MAX_WORKERS, thread_name_prefix="mcp")
         super().__init__(server_address, RequestHandlerClass, bind_and_activate)
-        self.dat_path = dat_path # Store the path of the DAT running the server
+
+    def process_request(self, request, client_address):
+        try: future = self.executor.submit(self._process_request_pooled, request, client_address)
+        except RuntimeError: self.shutdown_request(request); return  # Pool already shut down
+        # Connections still queued when the pool is shut down are cancelled; close their sockets
+        future.add_done_callback(lambda f: f.cancelled() and self.shutdown_request(request))
+
+    def _process_request_pooled(self, request, client_address):
+        try: self.finish_request(request, client_address)
+        except Exception: self.handle_error(request, client_address)
+        finally: self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        # Drop connections that never reached a worker; in-flight ones finish, bounded by the handler timeout
+        try: self.executor.shutdown(wait=False, cancel_futures=True)
+        except TypeError: self.executor.shutdown(wait=False)  # Python < 3.9
+
+# Context search limits: network depth below "/" and number of operators returned
+_CONTEXT_MAX_DEPTH = 3
+_CONTEXT_MAX_RESULTS = 50
+
+# Context results are reused for _CONTEXT_TTL seconds: query -> (time.monotonic() when found, items,
+# generation), least recently used first. Concurrent misses for one query wait on a single in-flight search.
+_CONTEXT_TTL = 3.0
+_CONTEXT_CACHE_SIZE = 512
+_context_cache = collections.OrderedDict()
+_context_pending = {}  # query -> Event set when its in-flight search finishes
+_context_lock = threading.Lock()
+
+# Bumped by _invalidate_context (main thread only) without taking a lock; cached results and the name
+# index record the generation they were built in and are ignored once it has moved on
+_context_generation = 0
+
+# Operator names under "/" (within _CONTEXT_MAX_DEPTH) for context search:
+# (built at, [(name, path, type)], generation). Rebuilt when older than _NAME_INDEX_MAX_AGE, to pick up
+# edits made in the network editor, or after an invalidation.
+_NAME_INDEX_MAX_AGE = 10.0
+_name_index = None
+_name_index_lock = threading.Lock()
+
+# Queries containing these are findChildren-style name patterns rather than plain substrings
+_CONTEXT_PATTERN_CHARS = frozenset("*?[] ^")
+
+# Pattern queries with a ^ exclusion term are left to findChildren, which applies TD's own pattern rules
+_CONTEXT_EXCLUDE_CHAR = "^"
+
+# Raised by TD when an operator is accessed after it was deleted
+_TD_ERROR = getattr(td, "tdError", Exception)
+
+def _context_entries(matches):
+    """Yields (name, path, type) for findChildren matches, skipping any deleted mid-walk.
+
+    findChildren only returns live operators, so instead of a .valid read per match a deleted one is
+    caught when its attributes are read.
+    """
+    for m in matches:
+        if m is None: continue
+        try: yield sys.intern(m.name), m.path, sys.intern(m.type)
+        except _TD_ERROR: continue
+
+def _get_name_index(max_age=_NAME_INDEX_MAX_AGE):
+    """Returns the operator name index, rebuilding it with one tree walk when missing or older than max_age."""
+    global _name_index
+    with _name_index_lock:
+        index = _name_index
+        if index is None or index[2] != _context_generation or time.monotonic() - index[0] >= max_age:
+            generation = _context_generation
+            index = _name_index = (time.monotonic(), list(_context_entries(op("/").findChildren(maxDepth=_CONTEXT_MAX_DEPTH))), generation)
+        return index[1]
+
+@functools.lru_cache(maxsize=256)
+def _context_pattern(query):
+    """Compiles a pattern query as findChildren(name=f"*{query}*") reads it: any of its space-separated globs.
+
+    Only used for queries without ^ exclusion terms, which fnmatch has no equivalent for.
+    """
+    return re.compile("|".join(fnmatch.translate(glob) for glob in f"*{query}*".split()))
+
+def _context_fresh(cached, now):
+    """Whether a _context_cache entry is within its TTL and from the current generation."""
+    return cached is not None and now - cached[0] < _CONTEXT_TTL and cached[2] == _context_generation
+
+def _context_rank(query, name):
+    """Relevance of a name containing the query, lowest first: exact match, prefix, then anywhere."""
+    return 0 if name == query else 1 if name.startswith(query) else 2
+
+def _invalidate_context():
+    """Retires cached context results and the name index after operators are created or deleted.
+
+    Runs on the main thread, so it never waits on a lock that a search may hold for a whole tree walk.
+    """
+    global _context_generation
+    _context_generation += 1
+
+# Streamed responses are written to the socket whenever this many bytes are buffered
+_STREAM_FLUSH_BYTES = 64 * 1024
+
+# Fixed structured responses for Claude Desktop, shared across requests (never mutated)
+_RESP_CREATE = {"content": [{"type": "text", "text": "Command queued: create component"}]}
+_RESP_DELETE = {"content": [{"type": "text", "text": "Command queued: delete component"}]}
+_RESP_SET = {"content": [{"type": "text", "text": "Command queued: set parameter"}]}
+_RESP_EXECUTE = {"content": [{"type": "text", "text": "Command queued: execute python"}]}
+_RESP_LIST = {"content": [{"type": "text", "text": "Command queued: list components"}]}
+_RESP_GET = {"content": [{"type": "text", "text": "Command queued: get info"}]}
+_RESP_STATUS = {"status": "running", "touchdesigner": True, "version": "1.0.0"}
+
+# Fixed header blocks, encoded once
+_JSON_HEADERS = b"Content-type: application/json\r\nAccess-Control-Allow-Origin: *\r\n"
+_OPTIONS_HEADERS = (b"Access-Control-Allow-Origin: *\r\n"
+                    b"Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+                    b"Access-Control-Allow-Headers: Content-Type\r\n")
+
+def _request_path(raw_path):
+    """Path part of a request target; only targets with a query, params or fragment go through urlparse."""
+    if "?" in raw_path or ";" in raw_path or "#" in raw_path: return urlparse(raw_path).path
+    return raw_path
 
 class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
     """Handler for TouchDesigner MCP requests"""
 
+    config = None  # ServerConfig for the running server; its dat_path names the DAT that drains commands
+    timeout = SERVER_REQUEST_TIMEOUT  # Socket timeout, so a stalled client can't pin a worker through shutdown
+    disable_nagle_algorithm = True  # TCP_NODELAY: small JSON replies go out without waiting on Nagle
+
     def log_message(self, format, *args): return # Suppress logs
 
+    def _send_preamble(self, status, header_bytes):
+        """Sends the status line plus a precomputed header block in a single write."""
+        self.send_response(status)
+        # send_header only appends encoded lines to this buffer, so add the whole block at once
+        self._headers_buffer.append(header_bytes)
+        self.end_headers()
+
     def _send_json(self, data, status=200):
         try:
-            self.send_response(status)
-            self.send_header("Content-type", "application/json")
-            self.send_header("Access-Control-Allow-Origin", "*")
-            self.end_headers()
-            self.wfile.write(json.dumps(data).encode("utf-8"))
-        except Exception as e: print(f"Error sending JSON response: {e}")
+            self._send_preamble(status, _JSON_HEADERS)
+            self.wfile.write(_dumps(data))
+        except Exception as e: _log.error("Error sending JSON response: %s", e)
+
+    def _send_json_items(self, key, items, status=200):
+        """Streams {key: [items...]} one item at a time instead of encoding the whole body at once."""
+        try:
+            self._send_preamble(status, _JSON_HEADERS)
+            # HTTP/1.0 responses are delimited by connection close, so no chunked framing is needed
+            buf = bytearray(b"{" + _dumps(key) + b":[")
+            for i, item in enumerate(items):
+                if i: buf += b","
+                buf += _dumps(item)
+                if len(buf) >= _STREAM_FLUSH_BYTES: self.wfile.write(buf); buf.clear()
+            buf += b"]}"
+            self.wfile.write(buf)
+        except Exception as e: _log.error("Error streaming JSON response: %s", e)
 
     def _handle_error(self, message, status_code=400):
-        print(f"MCP Server Error: {message} (Status: {status_code})")
+        _log.error("MCP Server Error: %s (Status: %s)", message, status_code)
         self._send_json({"error": {"message": message, "code": -32000}}, status=status_code)
 
     def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
-        self.end_headers()
+        self._send_preamble(200, _OPTIONS_HEADERS)
 
     def do_GET(self):
+        if _shutdown_event.is_set(): return self._handle_error("Server is shutting down", 503)
         try:
-            parsed_path = urlparse(self.path); path = parsed_path.path
-            if path == "/api/status" or path == "/":
-                self._send_json({"status": "running", "touchdesigner": True, "version": "1.0.0"})
+            if _request_path(self.path) in self._GET_PATHS: self._send_json(_RESP_STATUS)
             else: self._handle_error("Endpoint not found", 404)
         except Exception as e: self._handle_error(f"Error handling GET: {str(e)}", 500)
 
     def do_POST(self):
+        if _shutdown_event.is_set(): return self._handle_error("Server is shutting down", 503)
         try:
             content_length = int(self.headers.get("Content-Length", 0))
             if content_length == 0: return self._handle_error("Empty request body", 400)
-            post_data = self.rfile.read(content_length).decode("utf-8")
-            data = json.loads(post_data)
-            parsed_path = urlparse(self.path); path = parsed_path.path
-            if path == "/mcp": self._handle_mcp_request(data)
-            elif path == "/context": self._handle_context_request(data)
+            data = _loads(self.rfile.read(content_length))
+            path = _request_path(self.path)
+            route = self._POST_ROUTES.get(path)
+            if route: route(self, data)
             else: self._handle_error(f"Unknown POST endpoint: {path}", 404)
         except json.JSONDecodeError: self._handle_error("Invalid JSON", 400)
         except Exception as e: self._handle_error(f"Error handling POST: {str(e)}", 500)
@@ -1621,51 +1951,47 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
     def _handle_mcp_request(self, data):
         method = data.get("method"); params = data.get("params", {})
         if not method: return self._handle_error("Missing 'method'", 400)
-        print(f"Received MCP method: {method} with params: {params}")
+        _log.debug("Received MCP method: %s with params: %s", method, params)
         try:
-            result = None
-            if method == "create": result = self._tool_create_component(params)
-            elif method == "list": result = self._tool_list_components(params)
-            elif method == "delete": result = self._tool_delete_component(params)
-            elif method == "set": result = self._tool_set_parameter(params)
-            elif method == "get": result = self._tool_get_info(params)
-            elif method == "execute_python": result = self._tool_execute_python(params)
-            else: return self._handle_error(f"Unknown MCP method: {method}", 404)
-            self._send_json({"result": result})
+            tool = self._MCP_METHODS.get(method)
+            if not tool: return self._handle_error(f"Unknown MCP method: {method}", 404)
+            self._send_json({"result": tool(self, params)})
         except Exception as e:
             error_message = f"Error executing MCP method '{method}': {str(e)}"
-            print(error_message)
+            _log.error(error_message)
             self._send_json({"error": {"message": error_message, "code": -32001}}, status=500)
 
     def _handle_context_request(self, data):
-         query = data.get("query", ""); print(f"Received context query: {query}")
+         query = data.get("query", ""); _log.debug("Received context query: %s", query)
          try:
              context_items = self._get_context(query)
-             self._send_json({"contextItems": context_items})
+             self._send_json_items("contextItems", context_items)
          except Exception as e:
-             error_message = f"Error getting context: {str(e)}"; print(error_message)
+             error_message = f"Error getting context: {str(e)}"; _log.error(error_message)
              self._handle_error(error_message, 500)
 
-    # --- Tool Implementation Functions --- (ALL use run())
+    # Route tables, built once with the class
+    _GET_PATHS = frozenset(("/", "/api/status"))
+    _POST_ROUTES = {"/mcp": _handle_mcp_request, "/context": _handle_context_request}
+
+    # --- Tool Implementation Functions --- (ALL use the command queue)
 
     def _tool_create_component(self, params):
         """Queues component creation in the main thread."""
         try:
             if not params.get("type"): raise ValueError("Missing type param")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_create({repr(params_json)})", delayFrames=1)
+            _enqueue_cmd("create", params, self.config.dat_path)
             # Return structured response for Claude Desktop
-            return {"content": [{"type": "text", "text": "Command queued: create component"}]}
+            return _RESP_CREATE
         except Exception as e: raise RuntimeError(f"Error queuing create command: {e}")
 
     def _tool_delete_component(self, params):
         """Queues component deletion in the main thread."""
         try:
             if not params.get("path"): raise ValueError("Missing path param")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_delete({repr(params_json)})", delayFrames=1)
+            _enqueue_cmd("delete", params, self.config.dat_path)
             # Return structured response for Claude Desktop
-            return {"content": [{"type": "text", "text": "Command queued: delete component"}]}
+            return _RESP_DELETE
         except Exception as e: raise RuntimeError(f"Error queuing delete command: {e}")
 
     def _tool_set_parameter(self, params):
@@ -1673,108 +1999,188 @@ class TouchDesignerMCPHandler(BaseHTTPRequestHandler):
         try:
             if not params.get("path") or not params.get("parameter") or params.get("value") is None:
                  raise ValueError("Missing params for set")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_set({repr(params_json)})", delayFrames=1)
+            _enqueue_cmd("set", params, self.config.dat_path)
             # Return structured response for Claude Desktop
-            return {"content": [{"type": "text", "text": "Command queued: set parameter"}]}
+            return _RESP_SET
         except Exception as e: raise RuntimeError(f"Error queuing set command: {e}")
 
     def _tool_execute_python(self, params):
         """Queues Python execution in the main thread."""
         try:
             if not params.get("code"): raise ValueError("Missing code param")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_execute({repr(params_json)})", delayFrames=1)
+            _enqueue_cmd("execute", params, self.config.dat_path)
             # Return structured response for Claude Desktop
-            return {"content": [{"type": "text", "text": "Command queued: execute python"}]}
+            return _RESP_EXECUTE
         except Exception as e: raise RuntimeError(f"Error queuing execute command: {e}")
 
     def _tool_list_components(self, params):
         """Queues component listing in the main thread."""
         try:
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_list({repr(params_json)})", delayFrames=1)
+            if not _recently_queued("list", params.get("path", "/"), params.get("type")):
+                _enqueue_cmd("list", params, self.config.dat_path)
             # Return structured response for Claude Desktop
-            return {"content": [{"type": "text", "text": "Command queued: list components"}]}
+            return _RESP_LIST
         except Exception as e: raise RuntimeError(f"Error queuing list command: {e}")
 
     def _tool_get_info(self, params):
         """Queues component/parameter info retrieval in the main thread."""
         try:
             if not params.get("path"): raise ValueError("Missing path param")
-            params_json = json.dumps(params)
-            run(f"mod('{self.server.dat_path}')._run_get({repr(params_json)})", delayFrames=1)
+            if not _recently_queued("get", params["path"], params.get("parameter")):
+                _enqueue_cmd("get", params, self.config.dat_path)
             # Return structured response for Claude Desktop
-            return {"content": [{"type": "text", "text": "Command queued: get info"}]}
+            return _RESP_GET
         except Exception as e: raise RuntimeError(f"Error queuing get command: {e}")
 
+    _MCP_METHODS = {
+        "create": _tool_create_component,
+        "list": _tool_list_components,
+        "delete": _tool_delete_component,
+        "set": _tool_set_parameter,
+        "get": _tool_get_info,
+        "execute_python": _tool_execute_python,
+    }
+
     def _get_context(self, query):
         """Placeholder for context retrieval logic (direct call - potentially unsafe if TD API used)."""
         # NOTE: This context function might still cause threading issues if it uses TD API calls.
         # For safety, it should ideally also use run() or only access non-TD data.
+        while True:
+            with _context_lock:
+                cached = _context_cache.get(query)
+                if _context_fresh(cached, time.monotonic()):
+                    _context_cache.move_to_end(query)
+                    return cached[1]
+                pending = _context_pending.get(query)
+                if pending is None:
+                    pending = _context_pending[query] = threading.Event()
+                    break
+            # Another request is already searching for this query; reuse its result once it lands
+            pending.wait(_CONTEXT_TTL)
         try:
-            matches = op("/").findChildren(name=f"*{query}*") if TDF else []
-            context_items = []
-            for match in matches:
-                if match and match.valid:
-                    context_items.append({"uri": match.path, "content": f"Op: {match.name} ({match.type})", "metadata": {"type": "operator", "name": match.name}})
-            if not context_items: return [{"uri": "info:none", "content": "No relevant context found."}]
+            # Tagged with the generation the search started in, so a create/delete mid-search retires it
+            generation = _context_generation
+            context_items = self._search_context(query)
+            with _context_lock:
+                _context_cache[query] = (time.monotonic(), context_items, generation)
+                if len(_context_cache) > _CONTEXT_CACHE_SIZE: _context_cache.popitem(last=False)
             return context_items
-        except Exception as e: print(f"Context Error: {e}"); return [{"uri": "info:error", "content": "Error retrieving context."}]
+        except Exception as e: _log.error("Context Error: %s", e); return [{"uri": "info:error", "content": "Error retrieving context."}]
+        finally:
+            with _context_lock: _context_pending.pop(query, None)
+            pending.set()
+
+    def _search_context(self, query):
+        """Finds operators whose names contain the query."""
+        if not TDF: context_items = []
+        elif _CONTEXT_PATTERN_CHARS.isdisjoint(query):
+            # Plain substring: filter the prebuilt name index instead of walking the network, keeping only
+            # the best _CONTEXT_MAX_RESULTS hits: exact names, then prefixes, then other matches (stable)
+            hits = heapq.nsmallest(_CONTEXT_MAX_RESULTS, (entry for entry in _get_name_index() if query in entry[0]),
+                                   key=lambda entry: _context_rank(query, entry[0]))
+            context_items = [{"uri": path, "content": f"Op: {name} ({op_type})", "metadata": {"type": "operator", "name": name}}
+                             for name, path, op_type in hits]
+        elif _CONTEXT_EXCLUDE_CHAR in query:
+            # Bound the walk so a large project can't stall the HTTP thread
+            matches = op("/").findChildren(name=f"*{query}*", maxDepth=_CONTEXT_MAX_DEPTH)[:_CONTEXT_MAX_RESULTS]
+            context_items = [{"uri": path, "content": f"Op: {name} ({op_type})", "metadata": {"type": "operator", "name": name}}
+                             for name, path, op_type in _context_entries(matches)]
+        else:
+            # Pattern: one compiled regex over the name index, in walk order like findChildren returned them.
+            # The index may be at most _CONTEXT_TTL old here, no staler than a cached result.
+            match = _context_pattern(query).match
+            hits = itertools.islice((entry for entry in _get_name_index(_CONTEXT_TTL) if match(entry[0])), _CONTEXT_MAX_RESULTS)
+            context_items = [{"uri": path, "content": f"Op: {name} ({op_type})", "metadata": {"type": "operator", "name": name}}
+                             for name, path, op_type in hits]
+        if not context_items: return [{"uri": "info:none", "content": "No relevant context found."}]
+        return context_items
 
 
 # --- Server Control Functions ---
 
 def start_mcp_server(dat_op):
     """Starts the MCP HTTP server in a separate thread."""
-    global server_thread, server_instance, server_running, TDF # Ensure TDF is accessible
+    global TDF # Ensure TDF is accessible
 
     print(f"DEBUG: Inside start_mcp_server, TDF = {TDF}") # <-- ADD THIS LINE
 
-    # Stop any existing server first
-    if server_running:
-        print("Stopping existing MCP server...")
-        stop_mcp_server()
+    global _server_state
+    with _server_lock:
+        # Stop any existing server first
+        if _server_state is ServerState.RUNNING:
+            print("Stopping existing MCP server...")
+            _stop_mcp_server_locked()
+        _server_state = ServerState.STARTING
+        started = False
+        try: started = _start_mcp_server_locked(dat_op)
+        finally: _server_state = ServerState.RUNNING if started else ServerState.STOPPED
+        return started
+
+def _start_mcp_server_locked(dat_op):
+    """Creates and starts the server; the caller holds _server_lock."""
+    global server_thread, server_instance
 
     if not TDF:
         print("Running in mock mode - server will start with limited functionality.")
-        # Create a mock DAT operator for testing
-        class MockDatOp:
-            def __init__(self):
-                self.path = "/mock/text1"
-        dat_op = MockDatOp()
-        dat_path = dat_op.path
+        dat_path = MOCK_DAT_PATH
     else:
         if not dat_op or not isinstance(dat_op, td.OP):
             print("Error: DAT operator reference not provided or invalid.")
             return False
         dat_path = dat_op.path
+        # Build the context name index now, on the main thread, so the first query doesn't walk the network
+        try: _get_name_index()
+        except Exception as e: print(f"Context index warning: {e}")
 
     try:
         print(f"Creating server instance on {SERVER_HOST}:{SERVER_PORT}...")
-        server_instance = ThreadingHTTPServer((SERVER_HOST, SERVER_PORT), TouchDesignerMCPHandler, dat_path)
+        _shutdown_event.clear()
+        _start_log_listener()
+        TouchDesignerMCPHandler.config = ServerConfig(dat_path)
+        server_instance = ThreadingHTTPServer((SERVER_HOST, SERVER_PORT), TouchDesignerMCPHandler)
         print(f"Starting MCP server on port {SERVER_PORT} (DAT: {dat_path})...")
         server_thread = threading.Thread(target=server_instance.serve_forever)
         server_thread.daemon = True
         print("Starting server thread...")
         server_thread.start()
-        server_running = True
         print(f"MCP Server started successfully on http://{SERVER_HOST}:{SERVER_PORT}")
         return True
     except Exception as e:
         print(f"Failed to start MCP server: {e}")
-        import traceback
         traceback.print_exc()
-        server_instance = None; server_thread = None; server_running = False; return False
+        server_instance = None; server_thread = None; _stop_log_listener(); return False
 
 def stop_mcp_server():
     """Stops the MCP HTTP server."""
-    global server_thread, server_instance, server_running
-    if not server_running or not server_instance: print("MCP Server is not running."); return
+    with _server_lock: _stop_mcp_server_locked()
+
+def _stop_mcp_server_locked():
+    """Shuts the server down; the caller holds _server_lock."""
+    global server_thread, server_instance, _server_state
+    if _server_state is not ServerState.RUNNING or not server_instance: print("MCP Server is not running."); return
+    _server_state = ServerState.STOPPING
     print("Shutting down MCP server...")
+    _shutdown_event.set()
     try:
         server_instance.shutdown(); server_instance.server_close()
         server_thread.join(timeout=5)
         print("MCP Server stopped.")
     except Exception as e: print(f"Error stopping MCP server: {e}")
-    finally: server_instance = None; server_thread = None; server_running = False
\ No newline at end of file
+    finally:
+        server_instance = None; server_thread = None; _server_state = ServerState.STOPPED
+        _stop_log_listener()  # After the join, so messages from the last requests are flushed
+
+def _start_log_listener():
+    """Routes _log through the queue to a listener thread."""
+    if _log.mcp_listener is not None: return
+    _log.mcp_listener = logging.handlers.QueueListener(_log_q, _log_stream)
+    _log.mcp_listener.start()
+    _log.handlers[:] = [logging.handlers.QueueHandler(_log_q)]
+
+def _stop_log_listener():
+    """Writes _log records directly again, then flushes the queue and stops the listener thread."""
+    listener = _log.mcp_listener
+    if listener is None: return
+    _log.handlers[:] = [_log_stream]
+    _log.mcp_listener = None
+    listener.stop()
\ No newline at end of file